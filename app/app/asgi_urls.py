@@ -0,0 +1,26 @@
+"""URL configuration of the ASGI application
+
+Same URLs as app.urls, with the recipe read endpoints and the token
+endpoint served by async views, see recipe.async_views.
+"""
+from django.urls import path, include
+
+from app import urls
+
+
+# URL namespaces of app.urls replaced by their async version
+ASYNC_URLCONFS = {
+    'recipe': 'recipe.async_urls',
+    'user': 'user.async_urls',
+}
+
+
+def _async_pattern(pattern):
+    namespace = getattr(pattern, 'namespace', None)
+    if namespace not in ASYNC_URLCONFS:
+        return pattern
+
+    return path(str(pattern.pattern), include(ASYNC_URLCONFS[namespace]))
+
+
+urlpatterns = [_async_pattern(pattern) for pattern in urls.urlpatterns]
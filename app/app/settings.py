@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,22 +41,40 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
+    'core.apps.CoreConfig',
     'user',
-    'recipe',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+# ProfilingMiddleware measures each view, served at /api/metrics/ to staff
+# and the METRICS_ALLOWED_IPS, and logs statements run DUPLICATE_QUERIES
+# times by a request with STACK_DEPTH frames of their stack. Responses to
+# staff, or to anyone with DEBUG, carry a Server-Timing header. Disabled,
+# it is left out of the middleware stack.
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING') == '1',
+    'METRICS_ALLOWED_IPS': [
+        ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',')
+        if ip
+    ],
+    'DUPLICATE_QUERIES': 3,
+    'STACK_DEPTH': 8,
+}
+
+# app.asgi sets ROOT_URLCONF to app.asgi_urls, serving reads asynchronously
+ROOT_URLCONF = os.environ.get('ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -79,16 +98,59 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# DB_ENGINE can point to django.db.backends.sqlite3 to run locally without
+# PostgreSQL, features such as full text search then use simpler fallbacks.
+# The default engine hands connections back to a per-process pool, POOL
+# sizes are per worker. CONN_MAX_AGE keeps a connection per thread instead
+# and is best left at 0 with the pool, so idle threads release theirs.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get(
+            'DB_ENGINE',
+            'core.db.backends.postgresql_pool'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'MAX_IDLE': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'CHECK_INTERVAL': int(os.environ.get('DB_POOL_CHECK_INTERVAL', 10)),
+        },
     }
 }
 
+# DB_REPLICA_HOSTS lists read replicas of the default database, safe
+# requests read from a healthy one. Users are pinned to the primary for
+# PIN_SECONDS after a write, PIN_CACHE must be shared by every worker with
+# several WEB_WORKERS. Replicas are checked every CHECK_INTERVAL seconds,
+# a check gives up connecting after CHECK_TIMEOUT seconds.
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host
+]
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Threads running ORM work of async views, at most the pool MAX_SIZE
+ORM_EXECUTOR_THREADS = int(os.environ.get('ORM_EXECUTOR_THREADS', 8))
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+
+REPLICA_ROUTING = {
+    'REPLICAS': [f'replica{index}' for index in range(len(DB_REPLICA_HOSTS))],
+    'PIN_SECONDS': 5,
+    'PIN_CACHE': os.environ.get('REPLICA_PIN_CACHE', 'default'),
+    'CHECK_INTERVAL': 10,
+    'CHECK_TIMEOUT': int(os.environ.get('REPLICA_CHECK_TIMEOUT', 2)),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -108,6 +170,45 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# New passwords are hashed with the PASSWORD_HASHER algorithm, 'pbkdf2' or
+# the memory-hard 'argon2'. Hashes made with the other one or other costs
+# are upgraded on the next successful login. Hashing runs on a pool of
+# WORKERS threads.
+
+PASSWORD_HASHING = {
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 216000)),
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 512)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 2)),
+    'WORKERS': int(
+        os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1)
+    ),
+}
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+}
+_PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[_PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items()
+      if name != _PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+AUTHENTICATION_BACKENDS = ['core.backends.HashingPoolBackend']
+
+# Successful password checks are remembered in-process for TTL seconds as
+# a keyed digest of the password and its hash.
+CREDENTIAL_CACHE = {
+    'MAXSIZE': 10000,
+    'TTL': 300,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.1/topics/i18n/
@@ -133,3 +234,98 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Resized copies built for every uploaded recipe image
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': {'size': (150, 150), 'format': 'JPEG'},
+    'medium': {'size': (600, 600), 'format': 'JPEG'},
+    'webp': {'size': (1200, 1200), 'format': 'WEBP', 'quality': 80},
+}
+
+# Uploads are rejected as soon as they exceed the size or their header
+# shows dimensions over the maximum, headers must fit in HEADER_SIZE bytes.
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_DIMENSIONS = (8000, 8000)
+RECIPE_IMAGE_HEADER_SIZE = 256 * 1024
+# Partial files of resumable uploads, shared by every worker
+RECIPE_IMAGE_CHUNK_DIR = os.path.join(
+    tempfile.gettempdir(),
+    'recipe-image-chunks'
+)
+
+RECIPE_IMAGE_QUEUE = {
+    'BACKEND': 'recipe.images.ProcessPoolImageQueue',
+    'OPTIONS': {'max_workers': 2},
+}
+
+# Validated API tokens are cached for TTL seconds in the SHARED_CACHE entry
+# of CACHES shared by every worker, when set, and for LOCAL_TTL seconds
+# in-process. Invalidations only reach the process handling them and the
+# shared cache, other workers may accept a deleted token or a changed user
+# for LOCAL_TTL seconds.
+AUTH_TOKEN_CACHE = {
+    'MAXSIZE': 10000,
+    'TTL': 300,
+    'LOCAL_TTL': int(os.environ.get('AUTH_TOKEN_LOCAL_TTL', 30)),
+    'SHARED_CACHE': os.environ.get('AUTH_TOKEN_SHARED_CACHE'),
+}
+
+# Logins hand out signed API tokens valid for TTL seconds, refreshing one
+# extends its session up to MAX_AGE seconds after the login. Revoked
+# sessions are reloaded from the database every DENYLIST_SYNC_INTERVAL,
+# users are cached in-process no longer than that, so revocations,
+# password changes and deactivations reach every worker within it.
+SIGNED_TOKENS = {
+    'TTL': int(os.environ.get('TOKEN_TTL', 3600)),
+    'MAX_AGE': int(os.environ.get('TOKEN_MAX_AGE', 7 * 24 * 3600)),
+    'DENYLIST_SYNC_INTERVAL': 30,
+}
+
+# Worker processes serving the app, WEB_CONCURRENCY as read by gunicorn
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Serialized list responses are cached per user for TTL seconds, in-process
+# by default or in the SHARED_CACHE entry of CACHES when set, which is
+# required with several WEB_WORKERS.
+RESPONSE_CACHE = {
+    'MAXSIZE': 1000,
+    'TTL': 300,
+    'SHARED_CACHE': os.environ.get('RESPONSE_SHARED_CACHE'),
+}
+
+# Text search configuration used for the recipe search vectors
+RECIPE_SEARCH_CONFIG = 'english'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.RecipeCursorPagination',
+    'PAGE_SIZE': 50,
+    # orjson backed, falling back to json when orjson is not installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': ('core.throttling.TokenBucketThrottle',),
+    # Buckets of '<requests>/<period>' per user, see core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'upload': os.environ.get('THROTTLE_UPLOAD_RATE', '20/min'),
+        # Requests of resumable uploads, a 10 MB image takes many chunks
+        'upload_chunk': os.environ.get(
+            'THROTTLE_UPLOAD_CHUNK_RATE',
+            '300/min'
+        ),
+    },
+}
+
+# Throttle buckets are held in-process, at most MAXSIZE, and counted in
+# the SHARED_CACHE entry of CACHES too when set to limit every worker.
+THROTTLE = {
+    'MAXSIZE': 100000,
+    'SHARED_CACHE': os.environ.get('THROTTLE_SHARED_CACHE'),
+}
@@ -0,0 +1,148 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header
+)
+
+from core import tokens
+from core.cache import TieredCache
+
+
+def _build_token_cache(prefix='auth-token', max_local_ttl=None):
+    """Create the validated token cache from settings"""
+    options = getattr(settings, 'AUTH_TOKEN_CACHE', {})
+    local_ttl = options.get('LOCAL_TTL', 30)
+    if max_local_ttl is not None:
+        local_ttl = min(local_ttl, max_local_ttl)
+
+    return TieredCache(
+        prefix,
+        maxsize=options.get('MAXSIZE', 10000),
+        ttl=options.get('TTL', 300),
+        shared_alias=options.get('SHARED_CACHE'),
+        local_ttl=local_ttl,
+    )
+
+
+def _build_user_cache():
+    """Create the signed token user cache, kept no longer than revocations
+
+    Other processes see password changes and deactivations once their copy
+    expired, within DENYLIST_SYNC_INTERVAL seconds like revoked sessions.
+    """
+    return _build_token_cache(
+        'auth-user',
+        max_local_ttl=tokens.token_settings()['DENYLIST_SYNC_INTERVAL']
+    )
+
+
+token_cache = _build_token_cache()
+
+# Users authenticated by signed tokens, keyed by primary key
+user_cache = _build_user_cache()
+
+
+def invalidate_tokens(*keys):
+    """Drop the given token keys from the validated token cache"""
+    for key in keys:
+        token_cache.delete(key)
+
+
+def invalidate_user(pk):
+    """Drop a changed or deleted user from the authenticated user cache"""
+    user_cache.delete(pk)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication keeping validated tokens in memory
+
+    Entries expire after the configured TTL and are invalidated when the
+    token is deleted or its user changes, so a warm cache authenticates
+    without querying the database. Other processes keep their copy for
+    LOCAL_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+        elif not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        # Views may change the user they are handed, keep the cached copy
+        # untouched.
+        return (copy.copy(token.user), token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authentication with the expiring signed tokens of core.tokens
+
+    Clients send "Authorization: Bearer <token>". Tokens are validated
+    from their signature, the revoked sessions in memory and the cached
+    user, so a warm process authenticates without querying the database.
+    Revocations, password changes and deactivations handled by another
+    process are seen within DENYLIST_SYNC_INTERVAL seconds. request.auth
+    is the token payload.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.')
+            )
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.')
+            )
+
+        return self.authenticate_credentials(token)
+
+    def _get_user(self, pk):
+        user = user_cache.get(pk)
+        if user is None:
+            user = get_user_model().objects.filter(pk=pk).first()
+            if user is not None:
+                user_cache.set(pk, user)
+
+        return user
+
+    def authenticate_credentials(self, token):
+        try:
+            payload = tokens.read_token(token)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token expired.'))
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if payload['s'] in tokens.denylist:
+            raise exceptions.AuthenticationFailed(_('Token revoked.'))
+
+        user = self._get_user(payload['u'])
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        # Issued before the latest password change
+        if payload.get('c') != user.credentials_version:
+            raise exceptions.AuthenticationFailed(_('Token revoked.'))
+
+        return (copy.copy(user), payload)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.hashers import check_password, make_password
+
+
+class HashingPoolBackend(ModelBackend):
+    """Model backend verifying passwords with core.hashers
+
+    Hashing runs on the bounded hashing pool and repeated logins with the
+    same password are answered from the credential cache.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so unknown users take as long as known ones
+            make_password(password)
+            return None
+
+        if check_password(user, password) and self.user_can_authenticate(user):
+            return user
+
+        return None
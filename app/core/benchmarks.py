@@ -0,0 +1,452 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Recipe, Tag, Ingredient
+
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark scenario under name
+
+    Scenarios are called with the benchmarked user and the number of
+    repetitions and return a mapping of case names to measure() results.
+    """
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def percentile(values, pct):
+    """Return the pct percentile of values using the nearest rank"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+# Threads issuing requests at once in the load scenarios
+LOAD_THREADS = 8
+
+
+def timings(func, repeat):
+    """Call func repeat times, returning each duration in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return durations
+
+
+def latency_stats(durations):
+    """Return the latency stats of durations in milliseconds"""
+    return {
+        'min': min(durations),
+        'mean': statistics.mean(durations),
+        'p50': percentile(durations, 50),
+        'p99': percentile(durations, 99),
+    }
+
+
+def measure(func, repeat):
+    """Call func repeat times, returning latency stats in milliseconds"""
+    with CaptureQueriesContext(connection) as queries:
+        durations = timings(func, repeat)
+
+    return {
+        **latency_stats(durations),
+        'queries': len(queries) / repeat,
+        'throughput': repeat * 1000 / sum(durations),
+    }
+
+
+@contextmanager
+def rolled_back():
+    """Roll back the writes of the block, keeping the seeded data as is"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def client_settings(**overrides):
+    """Return settings letting Django's test clients call the API"""
+    from django.conf import settings
+    from django.test import override_settings
+
+    return override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        **overrides
+    )
+
+
+def load_stats(durations, elapsed):
+    """Return latency stats and requests per second of a load run"""
+    return {
+        **latency_stats(durations),
+        'throughput': len(durations) / elapsed,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of results against a baseline run
+
+    Both map scenario names to their cases' stats. Cases running more
+    queries than in the baseline regress, as do cases whose p50 latency
+    grew or throughput dropped by more than the tolerance, a fraction of
+    the baseline value. Cases missing from either run are not compared.
+    """
+    regressions = []
+    for name, cases in results.items():
+        for case, stats in cases.items():
+            before = baseline.get(name, {}).get(case)
+            if before is None:
+                continue
+
+            label = f'{name}.{case}'
+            if stats.get('queries', 0) > before.get('queries', 0):
+                regressions.append(
+                    f"{label}: {stats['queries']:.0f} queries, "
+                    f"{before.get('queries', 0):.0f} in the baseline"
+                )
+            if stats['p50'] > before['p50'] * (1 + tolerance):
+                regressions.append(
+                    f"{label}: p50 {stats['p50']:.2f}ms, "
+                    f"{before['p50']:.2f}ms in the baseline"
+                )
+            if 'throughput' in stats and 'throughput' in before and (
+                stats['throughput'] < before['throughput'] * (1 - tolerance)
+            ):
+                regressions.append(
+                    f"{label}: {stats['throughput']:.1f} req/s, "
+                    f"{before['throughput']:.1f} req/s in the baseline"
+                )
+
+    return regressions
+
+
+def measure_concurrent(func, repeat, threads=LOAD_THREADS):
+    """Call func repeat times from each of threads new threads at once"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(timings, func, repeat) for _ in range(threads)
+        ]
+
+    return load_stats(
+        [duration for future in futures for duration in future.result()],
+        time.perf_counter() - start
+    )
+
+
+def measure_async(func, repeat, tasks=LOAD_THREADS):
+    """Await func repeat times from each of tasks tasks at once"""
+    async def timed():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await func()
+            durations.append((time.perf_counter() - start) * 1000)
+        return durations
+
+    async def run():
+        return await asyncio.gather(*(timed() for _ in range(tasks)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+
+    return load_stats(
+        [duration for durations in results for duration in durations],
+        time.perf_counter() - start
+    )
+
+
+@scenario('filters')
+def filters_scenario(user, repeat):
+    """Time the first page and the count of filtered recipe lists"""
+    from recipe.filters import RecipeFilter
+
+    tag_ids = list(
+        Tag.objects.filter(user=user).values_list('id', flat=True)[:3]
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)[:3]
+    )
+
+    def ids(values):
+        return ','.join(str(value) for value in values)
+
+    cases = {
+        'tags_any': {'tags': ids(tag_ids)},
+        'tags_all': {'tags_all': ids(tag_ids[:2])},
+        'exclude_tags': {'exclude_tags': ids(tag_ids)},
+        'ingredients_any': {'ingredients': ids(ingredient_ids)},
+        'time_range': {'min_time': '30', 'max_time': '60'},
+        'price_range': {'min_price': '10', 'max_price': '20'},
+        'combined': {
+            'tags': ids(tag_ids),
+            'exclude_ingredients': ids(ingredient_ids[:1]),
+            'max_time': '90',
+        },
+    }
+
+    results = {}
+    for name, params in cases.items():
+        queryset = RecipeFilter(params).filter_queryset(
+            Recipe.objects.filter(user=user)
+        ).order_by('id')
+        results[f'{name}_page'] = measure(
+            lambda: list(queryset.values_list('id', flat=True)[:50]),
+            repeat
+        )
+        results[f'{name}_count'] = measure(queryset.count, repeat)
+
+    return results
+
+
+@scenario('connections')
+def connections_scenario(user, repeat):
+    """Time the recipe list under load, pooled and connecting per request"""
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    if connection.vendor != 'postgresql':
+        return {}
+
+    engines = {
+        'connect_per_request': 'django.db.backends.postgresql',
+        'pooled': 'core.db.backends.postgresql_pool',
+    }
+    url = reverse('recipe:recipe-list')
+
+    def list_recipes():
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get(url)
+        # The test client keeps connections open, close like a request end
+        connections[DEFAULT_DB_ALIAS].close()
+
+    # Every run uses new threads, which set up connections from the
+    # settings with the engine under test.
+    settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+    original_engine = settings_dict['ENGINE']
+    results = {}
+    try:
+        with client_settings():
+            for name, engine in engines.items():
+                settings_dict['ENGINE'] = engine
+                results[name] = measure_concurrent(list_recipes, repeat)
+    finally:
+        settings_dict['ENGINE'] = original_engine
+
+    return results
+
+
+@scenario('async_views')
+def async_views_scenario(user, repeat):
+    """Compare concurrent recipe list throughput of WSGI and ASGI views"""
+    from django.test import AsyncClient, Client
+    from django.urls import reverse
+
+    from core.tokens import issue_token
+
+    token, _ = issue_token(user)
+    authorization = f'Bearer {token}'
+    results = {}
+
+    with client_settings(ROOT_URLCONF='app.urls'):
+        url = reverse('recipe:recipe-list')
+
+        def wsgi_list():
+            Client().get(url, HTTP_AUTHORIZATION=authorization)
+            connections[DEFAULT_DB_ALIAS].close()
+
+        results['wsgi'] = measure_concurrent(wsgi_list, repeat)
+
+    with client_settings(ROOT_URLCONF='app.asgi_urls'):
+        client = AsyncClient()
+
+        async def asgi_list():
+            await client.get(url, authorization=authorization)
+
+        results['asgi'] = measure_async(asgi_list, repeat)
+
+    return results
+
+
+@scenario('attributes')
+def attributes_scenario(user, repeat):
+    """Time the first page of assigned tags and ingredients with counts
+
+    Compares the viewsets' EXISTS and counting subqueries with joining the
+    recipe links, meant for users seeded with 10k or more recipes.
+    """
+    from django.db.models import Count
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from recipe.views import IngredientViewSet, TagViewSet
+
+    def view_queryset(viewset, **params):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        return viewset(request=request, action='list').get_queryset()
+
+    def first_page(queryset, *fields):
+        return lambda: list(queryset.values('id', 'name', *fields)[:50])
+
+    viewsets = {'tags': TagViewSet, 'ingredients': IngredientViewSet}
+    results = {}
+    for name, viewset in viewsets.items():
+        joined = viewset.queryset.filter(user=user).order_by('-name')
+        results[f'{name}_assigned_join'] = measure(first_page(
+            joined.filter(recipe__isnull=False).distinct()
+        ), repeat)
+        results[f'{name}_assigned_exists'] = measure(first_page(
+            view_queryset(viewset, assigned_only=1)
+        ), repeat)
+        results[f'{name}_counts_join'] = measure(first_page(
+            joined.annotate(recipe_count=Count('recipe')), 'recipe_count'
+        ), repeat)
+        results[f'{name}_counts_subquery'] = measure(first_page(
+            view_queryset(viewset, with_counts=1), 'recipe_count'
+        ), repeat)
+
+    return results
+
+
+@scenario('logins')
+def logins_scenario(user, repeat):
+    """Time concurrent logins with each hasher, hashing and remembered
+
+    Runs as many login threads as hashing workers and reports the logins
+    per second of each worker core. The user's password is restored after.
+    """
+    from django.conf import settings
+    from django.contrib.auth import authenticate
+    from django.test import override_settings
+
+    from core.hashers import hashing_settings
+
+    hashers = {
+        'pbkdf2': ['core.hashers.PBKDF2PasswordHasher'],
+        'argon2': ['core.hashers.Argon2PasswordHasher'],
+    }
+    caches = {
+        'hashed': {'MAXSIZE': 0},
+        'remembered': settings.CREDENTIAL_CACHE,
+    }
+    workers = hashing_settings().get('WORKERS', 1)
+    password = 'bench-login-pass'
+
+    def login():
+        authenticate(username=user.email, password=password)
+        connections[DEFAULT_DB_ALIAS].close()
+
+    encoded = user.password
+    results = {}
+    try:
+        for name, hasher in hashers.items():
+            for case, cache_options in caches.items():
+                with override_settings(
+                    PASSWORD_HASHERS=hasher,
+                    CREDENTIAL_CACHE=cache_options
+                ):
+                    user.set_password(password)
+                    user.save(update_fields=['password'])
+                    stats = measure_concurrent(login, repeat, workers)
+                stats['per_core'] = stats['throughput'] / workers
+                results[f'{name}_{case}'] = stats
+    finally:
+        user.password = encoded
+        user.save(update_fields=['password'])
+
+    return results
+
+
+@scenario('api')
+def api_scenario(user, repeat):
+    """Time the recipe API calls of a client, from request to response
+
+    Covers listing, filtering, the detail, creating and uploading an image.
+    Throttling is off, writes are rolled back and images are stored in a
+    temporary directory, so runs leave the seeded data as they found it.
+    """
+    import io
+    import tempfile
+
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+    from PIL import Image
+    from rest_framework.test import APIClient
+
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+    if recipe is None:
+        return {}
+
+    tag_ids = list(
+        Tag.objects.filter(user=user).values_list('id', flat=True)[:3]
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)[:3]
+    )
+    list_url = reverse('recipe:recipe-list')
+    detail_url = reverse('recipe:recipe-detail', args=[recipe.id])
+    upload_url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(image, format='JPEG')
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def filter_recipes():
+        client.get(list_url, {
+            'tags': ','.join(str(pk) for pk in tag_ids),
+            'max_time': '90',
+        })
+
+    def create_recipe():
+        client.post(list_url, {
+            'title': 'Benchmark recipe',
+            'time_minutes': 30,
+            'price': '12.50',
+            'tags': tag_ids,
+            'ingredients': ingredient_ids,
+        }, format='json')
+
+    def upload_image():
+        upload = SimpleUploadedFile(
+            'bench.jpg',
+            image.getvalue(),
+            content_type='image/jpeg'
+        )
+        client.post(upload_url, {'image': upload}, format='multipart')
+
+    rest_framework = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as media_root, client_settings(
+        REST_FRAMEWORK=rest_framework,
+        MEDIA_ROOT=media_root
+    ):
+        results['list'] = measure(lambda: client.get(list_url), repeat)
+        results['filter'] = measure(filter_recipes, repeat)
+        results['detail'] = measure(lambda: client.get(detail_url), repeat)
+        with rolled_back():
+            results['create'] = measure(create_recipe, repeat)
+        with rolled_back():
+            results['upload_image'] = measure(upload_image, repeat)
+
+    return results
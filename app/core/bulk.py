@@ -0,0 +1,79 @@
+from django.db import connections, router
+from django.dispatch import Signal
+
+
+BATCH_SIZE = 500
+
+# Sent with the saved instances once objects and their relations were
+# written in bulk, which skips the per instance model signals.
+bulk_saved = Signal()
+
+
+def bulk_insert(model, objs, batch_size=BATCH_SIZE):
+    """Insert objs in batches and return them with primary keys set
+
+    Backends that can't return the ids of bulk inserted rows fall back to
+    inserting the objects one by one.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    for obj in objs:
+        obj.save(force_insert=True)
+
+    return objs
+
+
+def bulk_link(field, related_objects, clear=False, batch_size=BATCH_SIZE):
+    """Link instances to their related objects in bulk
+
+    field is the many to many field, related_objects is a list of pairs of a
+    saved instance and the related objects it should be linked with. With
+    clear the current links of those instances are removed first.
+    """
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    if clear:
+        through.objects.filter(**{
+            f'{source}__in': [instance.pk for instance, _ in related_objects]
+        }).delete()
+
+    rows = []
+    for instance, objs in related_objects:
+        for pk in {obj.pk for obj in objs}:
+            rows.append(through(**{
+                f'{source}_id': instance.pk,
+                f'{target}_id': pk,
+            }))
+
+    through.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def bulk_get_or_create_names(model, user, names, batch_size=BATCH_SIZE):
+    """Return the user's objects of model for every name, keyed by name
+
+    Missing names are inserted in bulk, rows a concurrent request inserted
+    in the meantime are skipped by the unique (user, name) constraint and
+    read back with the others.
+    """
+    names = set(names)
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = names - set(objs)
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in sorted(missing)],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        objs.update(
+            (obj.name, obj)
+            for obj in model.objects.filter(user=user, name__in=missing)
+        )
+
+    return objs
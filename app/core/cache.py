@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_process_local(alias):
+    """Return whether the Django cache alias can't be seen by other workers"""
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+class LRUCache:
+    """Bounded in-process cache evicting the least recently used entries"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for key, or default if missing or expired"""
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return default
+
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value for key, evicting the oldest entries when full"""
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """In-process LRU cache optionally backed by a shared Django cache
+
+    The shared tier lets several worker processes reuse each other's entries
+    and is only consulted when the local tier misses. Local entries live
+    local_ttl seconds, by default ttl, deleting a key in another process
+    only reaches this one once they expired.
+    """
+
+    def __init__(self, prefix, maxsize=1024, ttl=300, shared_alias=None,
+                 local_ttl=None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.local = LRUCache(
+            maxsize=maxsize,
+            ttl=ttl if local_ttl is None else min(local_ttl, ttl)
+        )
+        self.shared_alias = shared_alias
+
+    @property
+    def shared(self):
+        """Return the shared cache backend, if one is configured"""
+        if self.shared_alias is None:
+            return None
+        return caches[self.shared_alias]
+
+    def _shared_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key, default=None):
+        """Return the value for key from the first tier holding it"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        shared = self.shared
+        if shared is None:
+            return default
+
+        value = shared.get(self._shared_key(key))
+        if value is None:
+            return default
+
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store value for key in every tier"""
+        self.local.set(key, value)
+        shared = self.shared
+        if shared is not None:
+            shared.set(self._shared_key(key), value, self.ttl)
+
+    def delete(self, key):
+        """Remove key from every tier"""
+        self.local.delete(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def clear(self):
+        """Remove every local entry, shared entries expire on their own"""
+        self.local.clear()
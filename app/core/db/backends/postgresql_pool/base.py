@@ -0,0 +1,60 @@
+import psycopg2.extras
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+from core.db.pool import get_pool
+
+
+def _connector(conn_params, options):
+    """Return a function opening connections configured like Django's"""
+    def connect():
+        connection = base.Database.connect(**conn_params)
+        isolation_level = options.get('isolation_level')
+        if (isolation_level is not None
+                and isolation_level != connection.isolation_level):
+            connection.set_session(isolation_level=isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection,
+            loads=lambda x: x
+        )
+        return connection
+
+    return connect
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend reusing connections from a per-process pool
+
+    Pool sizes are read from the POOL entry of the database settings, see
+    core.db.pool.ConnectionPool. Closing a Django connection, e.g. at the
+    end of a request when CONN_MAX_AGE is 0, hands it back to the pool.
+    """
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        """Return the pool serving the given connection parameters"""
+        key = (self.alias, tuple(sorted(
+            (name, repr(value)) for name, value in conn_params.items()
+        )))
+        return get_pool(
+            key,
+            _connector(conn_params, self.settings_dict['OPTIONS']),
+            self.settings_dict.get('POOL', {})
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.checkout()
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.checkin(self.connection)
@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool running ORM work for async code"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ORM_EXECUTOR_THREADS,
+                thread_name_prefix='orm'
+            )
+        return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+
+    if setting == 'ORM_EXECUTOR_THREADS':
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = None
+
+
+def _call_with_connections(func, *args, **kwargs):
+    """Call func, closing the thread's expired connections around it"""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run blocking ORM code on the bounded executor from async code
+
+    Unlike sync_to_async, calls are not serialized on a single thread,
+    at most ORM_EXECUTOR_THREADS run at once. The caller's context
+    variables, e.g. the read replica, are visible to func.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(
+        context.run,
+        _call_with_connections,
+        func,
+        *args,
+        **kwargs
+    )
+
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(),
+        call
+    )
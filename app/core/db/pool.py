@@ -0,0 +1,181 @@
+import collections
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections owned by one worker process
+
+    MAX_SIZE bounds the connections the process opens, checkouts beyond it
+    wait up to TIMEOUT seconds for one to be returned. Up to MIN_SIZE idle
+    connections are kept open indefinitely, the others are closed after
+    MAX_IDLE seconds. Connections idle for more than CHECK_INTERVAL seconds
+    are pinged before being handed out again.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30,
+                 max_idle=300, check_interval=10):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+        self.size = 0
+        self._idle = collections.deque()
+        self._condition = threading.Condition()
+
+    def _reserve(self, deadline):
+        """Return an idle connection, or None once allowed to open one"""
+        while True:
+            if self._idle:
+                return self._idle.pop()
+            if self.size < self.max_size:
+                self.size += 1
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise psycopg2.OperationalError(
+                    f'Timed out after {self.timeout}s waiting for one of '
+                    f'{self.max_size} pooled connections.'
+                )
+            self._condition.wait(remaining)
+
+    def _is_healthy(self, connection, idle_since):
+        """Return whether an idle connection still works"""
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+
+        return True
+
+    def _release(self, count=1):
+        with self._condition:
+            self.size -= count
+            self._condition.notify(count)
+
+    def _discard(self, connection):
+        """Close a connection and free its slot"""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        self._release()
+
+    def checkout(self):
+        """Return a working connection, opening one if the pool allows"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                idle = self._reserve(deadline)
+
+            if idle is None:
+                try:
+                    return self.connect()
+                except BaseException:
+                    self._release()
+                    raise
+
+            connection, idle_since = idle
+            if self._is_healthy(connection, idle_since):
+                return connection
+            self._discard(connection)
+
+    def checkin(self, connection):
+        """Return a connection, rolling back any transaction left open"""
+        if os.getpid() != self.pid:
+            # Connections inherited through fork belong to the parent
+            return
+
+        status = (
+            extensions.TRANSACTION_STATUS_UNKNOWN if connection.closed
+            else connection.get_transaction_status()
+        )
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            self._discard(connection)
+            return
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self._discard(connection)
+                return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._close_expired()
+            self._condition.notify()
+
+    def _close_expired(self):
+        """Close the oldest idle connections above MIN_SIZE past MAX_IDLE"""
+        now = time.monotonic()
+        while (self._idle and self.size > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            connection, _ = self._idle.popleft()
+            self.size -= 1
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+
+    def close(self):
+        """Close every idle connection"""
+        with self._condition:
+            idle, self._idle = self._idle, collections.deque()
+            self.size -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(key, connect, options):
+    """Return the pool of this process for key, creating it when missing"""
+    global _pools_pid
+
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Forked worker, start over without touching the parent's sockets
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30),
+                max_idle=options.get('MAX_IDLE', 300),
+                check_interval=options.get('CHECK_INTERVAL', 10),
+            )
+
+        return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
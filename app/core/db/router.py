@@ -0,0 +1,175 @@
+import contextlib
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+from django.utils.functional import SimpleLazyObject
+
+
+# Replica alias serving the reads of the current request, None for primary,
+# or the PendingRoute choosing it
+_replica = ContextVar('replica', default=None)
+
+# Alias to (healthy, monotonic time of the check) of this process
+_replica_health = {}
+
+
+def replica_settings():
+    options = getattr(settings, 'REPLICA_ROUTING', {})
+    return {
+        'REPLICAS': options.get('REPLICAS', []),
+        'PIN_SECONDS': options.get('PIN_SECONDS', 5),
+        'PIN_CACHE': options.get('PIN_CACHE', 'default'),
+        'CHECK_INTERVAL': options.get('CHECK_INTERVAL', 10),
+        'CHECK_TIMEOUT': options.get('CHECK_TIMEOUT', 2),
+    }
+
+
+def check_replica(alias, timeout):
+    """Run a query on a new connection to a replica, raise when it fails
+
+    The connection is opened outside of the pool and gives up after timeout
+    seconds on PostgreSQL, so an unreachable replica holds up the request
+    checking it no longer than that.
+    """
+    connection = connections[alias]
+    params = connection.get_connection_params()
+    if connection.vendor == 'postgresql':
+        params['connect_timeout'] = timeout
+
+    with connection.wrap_database_errors:
+        probe = connection.Database.connect(**params)
+        try:
+            cursor = probe.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            probe.close()
+
+
+def is_healthy(alias, check_interval, check_timeout):
+    """Return whether a replica answered its latest check
+
+    Replicas are checked again once check_interval seconds passed, an
+    unhealthy one is skipped until then. Checks wait check_timeout seconds
+    for the connection.
+    """
+    healthy, checked_at = _replica_health.get(alias, (False, None))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < check_interval:
+        return healthy
+
+    try:
+        check_replica(alias, check_timeout)
+    except OperationalError:
+        healthy = False
+    else:
+        healthy = True
+    _replica_health[alias] = (healthy, now)
+
+    return healthy
+
+
+def choose_replica():
+    """Return a healthy replica alias, or None to read from the primary"""
+    options = replica_settings()
+    replicas = [
+        alias for alias in options['REPLICAS']
+        if is_healthy(
+            alias,
+            options['CHECK_INTERVAL'],
+            options['CHECK_TIMEOUT']
+        )
+    ]
+
+    return random.choice(replicas) if replicas else None
+
+
+def request_user(request):
+    """Return the user the API view authenticated, None before that
+
+    AuthenticationMiddleware's lazy session user doesn't count, the API
+    authentication classes replace it with the user of the token.
+    """
+    user = request.__dict__.get('user')
+    if user is None or isinstance(user, SimpleLazyObject):
+        return None
+
+    return user
+
+
+class PendingRoute:
+    """Replica of a request, chosen once its user is authenticated
+
+    choose is called with the user and returns the alias to read from.
+    Reads before that, those authenticating the request included, go to the
+    primary.
+    """
+
+    def __init__(self, request, choose):
+        self.request = request
+        self.choose = choose
+        self.alias = None
+        self.chosen = False
+
+    def resolve(self):
+        if not self.chosen:
+            user = request_user(self.request)
+            if user is None:
+                return None
+            # Reads made while choosing, e.g. by a database cache, use the
+            # primary
+            self.chosen = True
+            self.alias = self.choose(user)
+
+        return self.alias
+
+
+def current_replica():
+    """Return the replica reads go to now, None for the primary"""
+    route = _replica.get()
+    if isinstance(route, PendingRoute):
+        return route.resolve()
+
+    return route
+
+
+@contextlib.contextmanager
+def read_from(alias):
+    """Route the reads of the enclosed block to alias, None is the primary
+
+    alias may be a PendingRoute, resolved at the first read.
+    """
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads to the replica picked for the request, writes to primary
+
+    Reads go to the primary outside of ReplicaRoutingMiddleware, so
+    commands and background work always see the latest data.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_settings()['REPLICAS']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_settings()['REPLICAS']:
+            return False
+        return None
@@ -0,0 +1,155 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from core.cache import LRUCache
+
+
+def hashing_settings():
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher running the iterations set in PASSWORD_HASHING"""
+
+    @property
+    def iterations(self):
+        return hashing_settings().get(
+            'PBKDF2_ITERATIONS',
+            hashers.PBKDF2PasswordHasher.iterations
+        )
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Memory-hard Argon2 hasher with the costs set in PASSWORD_HASHING"""
+
+    @property
+    def time_cost(self):
+        return hashing_settings().get(
+            'ARGON2_TIME_COST',
+            hashers.Argon2PasswordHasher.time_cost
+        )
+
+    @property
+    def memory_cost(self):
+        return hashing_settings().get(
+            'ARGON2_MEMORY_COST',
+            hashers.Argon2PasswordHasher.memory_cost
+        )
+
+    @property
+    def parallelism(self):
+        return hashing_settings().get(
+            'ARGON2_PARALLELISM',
+            hashers.Argon2PasswordHasher.parallelism
+        )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    """Return the thread pool running password hashing
+
+    Hashing releases the GIL, so WORKERS threads keep as many cores busy
+    while the requests of a login burst wait their turn.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=hashing_settings().get('WORKERS', 1),
+                thread_name_prefix='hashing'
+            )
+        return _executor
+
+
+def _build_credential_cache():
+    options = getattr(settings, 'CREDENTIAL_CACHE', {})
+    return LRUCache(
+        maxsize=options.get('MAXSIZE', 10000),
+        ttl=options.get('TTL', 300)
+    )
+
+
+credential_cache = _build_credential_cache()
+
+
+@receiver(setting_changed)
+def reset_hashing(setting, **kwargs):
+    global _executor, credential_cache
+
+    if setting == 'PASSWORD_HASHING':
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = None
+    elif setting == 'CREDENTIAL_CACHE':
+        credential_cache = _build_credential_cache()
+
+
+def make_password(password):
+    """Hash password with the preferred hasher on the hashing pool"""
+    return get_hashing_executor().submit(
+        hashers.make_password,
+        password
+    ).result()
+
+
+def _credential_digest(user, password):
+    """Return a keyed digest of the password and the user's current hash"""
+    return salted_hmac(
+        'core.hashers.credential',
+        f'{user.pk}:{user.password}:{password}',
+        algorithm='sha256'
+    ).hexdigest()
+
+
+def _must_update(encoded):
+    preferred = hashers.get_hasher('default')
+    hasher = hashers.identify_hasher(encoded)
+    return (
+        hasher.algorithm != preferred.algorithm
+        or preferred.must_update(encoded)
+    )
+
+
+def check_password(user, password):
+    """Return whether password is the user's, rehashing outdated hashes
+
+    Passwords are verified on the hashing pool, a successful check is
+    remembered as a keyed digest of the password and the hash so repeated
+    logins skip hashing until the password changes or the entry expires.
+    Hashes from another hasher or with other costs than the preferred one
+    are replaced once the password is verified.
+    """
+    digest = credential_cache.get(user.pk)
+    if (digest is not None
+            and constant_time_compare(
+                digest,
+                _credential_digest(user, password)
+            )
+            and not _must_update(user.password)):
+        return True
+
+    is_correct = get_hashing_executor().submit(
+        hashers.check_password,
+        password,
+        user.password
+    ).result()
+    if not is_correct:
+        return False
+
+    if _must_update(user.password):
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    credential_cache.set(user.pk, _credential_digest(user, password))
+
+    return True
@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+
+class NotReady(Exception):
+    """The database is reachable but not ready to serve the app"""
+
+
+# Set once every migration was found applied, they are not reverted while
+# the app runs so the migration graph is only loaded until then.
+_migrated_aliases = set()
+
+
+def check_database(alias=DEFAULT_DB_ALIAS, check_migrations=False):
+    """Connect to the database and run a query, raise when not ready"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except OperationalError:
+        # Drop the broken connection so the next check reconnects
+        connection.close()
+        raise
+
+    if check_migrations and alias not in _migrated_aliases:
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            raise NotReady(f'{len(plan)} migrations are not applied.')
+        _migrated_aliases.add(alias)
+
+
+def backoff_delays(base=0.1, cap=5.0):
+    """Yield exponentially growing delays with full jitter"""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * 2 ** attempt))
+        attempt += 1
+
+
+def wait_for_database(timeout, alias=DEFAULT_DB_ALIAS,
+                      check_migrations=False, on_retry=None):
+    """Retry check_database until it passes or timeout seconds elapsed
+
+    on_retry is called with the error and the delay before each retry, the
+    last error is raised once the deadline is reached.
+    """
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays():
+        try:
+            return check_database(alias, check_migrations)
+        except (OperationalError, NotReady) as exc:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            delay = min(delay, remaining)
+            if on_retry is not None:
+                on_retry(exc, delay)
+            time.sleep(delay)
@@ -0,0 +1,119 @@
+import json
+import platform
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import SCENARIOS, compare
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to time API scenarios against seeded data"""
+    help = (
+        'Run benchmark scenarios, seed data first with seed_recipes. Runs '
+        'against the configured database, DB_ENGINE=django.db.backends.'
+        'sqlite3 with DB_NAME a file path benchmarks SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help=f"Scenarios to run, one of: {', '.join(SCENARIOS)}"
+        )
+        parser.add_argument('--user', default='bench0@bench.local')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Write the results to this JSON file'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Fail when regressing from the results in this JSON file'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Latency and throughput change allowed from the baseline'
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        user = get_user_model().objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(
+                f"User {options['user']} not found, run seed_recipes first"
+            )
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        results = {}
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            results[name] = SCENARIOS[name](user, options['repeat'])
+            for case, stats in results[name].items():
+                self.stdout.write(self.format_stats(case, stats))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as json_file:
+                json.dump({
+                    'meta': self.run_meta(user, options),
+                    'scenarios': results,
+                }, json_file, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            self.check_baseline(results, baseline, options['tolerance'])
+
+    def format_stats(self, case, stats):
+        """Return the line printed for the stats of a case"""
+        line = (
+            f"  {case:<32} p50 {stats['p50']:8.2f}ms  "
+            f"p99 {stats['p99']:8.2f}ms"
+        )
+        if 'queries' in stats:
+            line += f"  queries {stats['queries']:.0f}"
+        if 'throughput' in stats:
+            line += f"  {stats['throughput']:8.1f} req/s"
+        if 'per_core' in stats:
+            line += f"  {stats['per_core']:8.1f} req/s/core"
+
+        return line
+
+    def run_meta(self, user, options):
+        """Return what the results depend on besides the code"""
+        return {
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'recipes': Recipe.objects.filter(user=user).count(),
+            'repeat': options['repeat'],
+            'user': user.email,
+        }
+
+    def check_baseline(self, results, baseline, tolerance):
+        """Raise CommandError listing the regressions from the baseline"""
+        vendor = baseline.get('meta', {}).get('database')
+        if vendor and vendor != connection.vendor:
+            self.stderr.write(
+                f'The baseline ran on {vendor}, comparing anyway'
+            )
+
+        regressions = compare(
+            results,
+            baseline.get('scenarios', {}),
+            tolerance
+        )
+        if regressions:
+            raise CommandError(
+                'Regressed from the baseline:\n  ' + '\n  '.join(regressions)
+            )
+
+        self.stdout.write(self.style.SUCCESS('No regression from baseline'))
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bulk import BATCH_SIZE
+
+from recipe.importer import FORMATS, RecipeImporter, format_from_name
+from recipe.importer import read_records
+
+
+class Command(BaseCommand):
+    """Django command to import recipes of a user from a file"""
+    help = 'Import recipes from an NDJSON or CSV file, e.g. an export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user owning the imported recipes'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='File format, guessed from the extension by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} not found")
+
+        file_format = options['format'] or format_from_name(options['path'])
+        if file_format is None:
+            raise CommandError(
+                'Unknown file format, use --format ndjson or --format csv'
+            )
+
+        importer = RecipeImporter(user, batch_size=options['batch_size'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(read_records(stream, file_format))
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for line, errors in report.errors:
+            self.stderr.write(f'Line {line}: {errors}')
+        if report.unreadable:
+            raise CommandError(
+                f'Import stopped after creating {report.created} recipes, '
+                f'{report.unreadable}'
+            )
+
+        self.stdout.write(
+            f'Processed {report.processed} rows in {report.elapsed:.1f}s '
+            f'({report.throughput:.0f} rows/s), created {report.created} '
+            f'recipes, {len(report.errors)} rows rejected'
+        )
+        self.stdout.write(self.style.SUCCESS('Import finished!'))
@@ -0,0 +1,108 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.bulk import bulk_get_or_create_names
+from core.models import Tag, Ingredient, Recipe
+from core.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    """Django command to seed users with generated recipes for benchmarks"""
+    help = 'Create users owning generated recipes, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Recipes created per user'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=50,
+            help='Tags created per user'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=200,
+            help='Ingredients created per user'
+        )
+        parser.add_argument(
+            '--links', type=int, default=3,
+            help='Tags and ingredients linked to each recipe'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--email-prefix', default='bench')
+        parser.add_argument('--password', default='bench-pass')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        for n in range(options['users']):
+            email = f"{options['email_prefix']}{n}@bench.local"
+            user = get_user_model().objects.filter(email=email).first()
+            if user is None:
+                user = get_user_model().objects.create_user(
+                    email,
+                    options['password']
+                )
+
+            start = time.perf_counter()
+            self.seed_user(user, rng, options)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"Seeded {email} with {options['recipes']} recipes "
+                f"in {elapsed:.1f}s"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Seeding finished!'))
+
+    def seed_user(self, user, rng, options):
+        """Create the tags, ingredients and recipes of a user"""
+        tags = list(bulk_get_or_create_names(Tag, user, [
+            f'Tag {i}' for i in range(options['tags'])
+        ]).values())
+        ingredients = list(bulk_get_or_create_names(Ingredient, user, [
+            f'Ingredient {i}' for i in range(options['ingredients'])
+        ]).values())
+
+        batch_size = options['batch_size']
+        remaining = options['recipes']
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            remaining -= count
+            Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=f'Recipe {rng.randrange(10 ** 6)}',
+                    time_minutes=rng.randint(5, 240),
+                    price=rng.randint(100, 99999) / 100,
+                )
+                for _ in range(count)
+            ])
+            # Not every backend returns the ids of bulk inserted rows, read
+            # back the newest recipes of the user instead.
+            recipe_ids = list(Recipe.objects.filter(user=user).order_by(
+                '-id'
+            ).values_list('id', flat=True)[:count])
+
+            self.link(Recipe.tags, 'tag_id', recipe_ids, tags, rng, options)
+            self.link(
+                Recipe.ingredients,
+                'ingredient_id',
+                recipe_ids,
+                ingredients,
+                rng,
+                options
+            )
+            update_search_vectors(recipe_ids)
+
+    def link(self, descriptor, column, recipe_ids, objs, rng, options):
+        """Link each recipe to random related objects"""
+        through = descriptor.through
+        links = min(options['links'], len(objs))
+        through.objects.bulk_create([
+            through(recipe_id=recipe_id, **{column: obj.pk})
+            for recipe_id in recipe_ids
+            for obj in rng.sample(objs, links)
+        ], batch_size=options['batch_size'])
@@ -1,21 +1,43 @@
-import time
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import NotReady, wait_for_database
 
 
 class Command(BaseCommand):
     """Django to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--check-migrations', action='store_true',
+            help='Also wait until every migration is applied'
+        )
+
+    def on_retry(self, exc, delay):
+        self.stdout.write(
+            f'Database unavailable ({exc}), waiting {delay:.2f} seconds...'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_connection = None
-
-        while not db_connection:
-            try:
-                db_connection = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, wating 1 second...')
-                time.sleep(1)
+
+        try:
+            wait_for_database(
+                options['timeout'],
+                alias=options['database'],
+                check_migrations=options['check_migrations'],
+                on_retry=self.on_retry
+            )
+        except (OperationalError, NotReady) as exc:
+            raise CommandError(
+                f"Database not ready after {options['timeout']:g} "
+                f"seconds: {exc}"
+            )
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
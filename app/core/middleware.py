@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+from core import profiling
+from core.cache import is_process_local
+from core.db.executor import run_sync
+from core.db.router import (
+    PendingRoute, choose_replica, read_from, replica_settings, request_user
+)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests from a replica unless the user wrote recently
+
+    A successful unsafe request pins its user to the primary for
+    PIN_SECONDS, so users read their own writes despite replication lag,
+    whichever token or device they use. Several workers need a PIN_CACHE
+    they all see, replicas are refused otherwise.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = replica_settings()
+        if (
+            options['REPLICAS']
+            and getattr(settings, 'WEB_WORKERS', 1) > 1
+            and is_process_local(options['PIN_CACHE'])
+        ):
+            raise ImproperlyConfigured(
+                f"REPLICA_ROUTING PIN_CACHE {options['PIN_CACHE']!r} is "
+                f'local to each of the {settings.WEB_WORKERS} WEB_WORKERS, '
+                'set REPLICA_PIN_CACHE to a cache they share'
+            )
+
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def pin_key(self, user):
+        return f'replica-pin:user:{user.pk}'
+
+    def route(self, request, options):
+        """Return the route of the request's reads, None for the primary
+
+        The replica of a safe request is chosen once the view authenticated
+        its user, pinned users read from the primary.
+        """
+        if request.method not in SAFE_METHODS:
+            return None
+
+        def choose(user):
+            pins = caches[options['PIN_CACHE']]
+            if user.is_authenticated and pins.get(self.pin_key(user)):
+                return None
+            return choose_replica()
+
+        return PendingRoute(request, choose)
+
+    def pin(self, request, response, options):
+        """Pin the user to the primary after a successful write"""
+        user = request_user(request)
+        if (request.method not in SAFE_METHODS and user is not None
+                and user.is_authenticated and response.status_code < 400):
+            caches[options['PIN_CACHE']].set(
+                self.pin_key(user),
+                True,
+                options['PIN_SECONDS']
+            )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        options = replica_settings()
+        if not options['REPLICAS']:
+            return self.get_response(request)
+
+        with read_from(self.route(request, options)):
+            response = self.get_response(request)
+        self.pin(request, response, options)
+
+        return response
+
+    async def __acall__(self, request):
+        options = replica_settings()
+        if not options['REPLICAS']:
+            return await self.get_response(request)
+
+        with read_from(self.route(request, options)):
+            response = await self.get_response(request)
+        await run_sync(self.pin, request, response, options)
+
+        return response
+
+
+class ProfilingMiddleware:
+    """Measure every request when PROFILING is enabled
+
+    Records the wall time, SQL queries and their time, serialization time
+    and response size per view, served as Prometheus metrics by
+    core.views.metrics. Statements a request repeats are logged with the
+    serializer field and the stack running them, and the request's timings
+    are sent in a Server-Timing header to staff users, or anyone with
+    DEBUG. When disabled the middleware removes itself from the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling.profiling_settings()['ENABLED']:
+            raise MiddlewareNotUsed()
+
+        profiling.install()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def record(self, request, response, profile, seconds, staff):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        if response.streaming:
+            size = 0
+        else:
+            size = len(response.content)
+
+        profiling.view_stats.add(
+            view,
+            request.method,
+            profile,
+            seconds,
+            size
+        )
+        if profile.duplicates:
+            profiling.report_duplicates(view, profile)
+
+        if settings.DEBUG or staff:
+            self.add_server_timing(response, profile, seconds)
+
+    def add_server_timing(self, response, profile, seconds):
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={seconds * 1000:.1f}',
+            f'sql;dur={profile.sql_seconds * 1000:.1f};'
+            f'desc="{profile.sql_count} queries"',
+            f"serialize;dur={profile.sections['serialize'] * 1000:.1f}",
+        ))
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with profiling.profiling() as profile:
+            response = self.get_response(request)
+        self.record(
+            request,
+            response,
+            profile,
+            time.perf_counter() - start,
+            profiling.is_staff(request)
+        )
+
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with profiling.profiling() as profile:
+            response = await self.get_response(request)
+        seconds = time.perf_counter() - start
+        # The session user may have to be loaded from the database
+        staff = await run_sync(profiling.is_staff, request)
+        self.record(request, response, profile, seconds, staff)
+
+        return response
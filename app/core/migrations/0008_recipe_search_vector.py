@@ -0,0 +1,61 @@
+# Generated by Django 3.1 on 2026-10-17 04:16
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def names_sql(model, column):
+    return (
+        f"(SELECT string_agg(related.name, ' ') FROM core_{model} related "
+        f"JOIN core_recipe_{model}s link ON link.{column} = related.id "
+        f"WHERE link.recipe_id = core_recipe.id)"
+    )
+
+
+BACKFILL_SQL = (
+    "UPDATE core_recipe SET search_vector = "
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(title, '')), 'A') "
+    "|| setweight(to_tsvector(%(config)s::regconfig, coalesce("
+    f"{names_sql('tag', 'tag_id')}, '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce("
+    f"{names_sql('ingredient', 'ingredient_id')}, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Index and backfill the search vectors, PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_idx '
+        'ON core_recipe USING gin (search_vector);'
+    )
+    # Same text search config as update_search_vectors
+    schema_editor.execute(
+        BACKFILL_SQL, {'config': settings.RECIPE_SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX core_recipe_search_vector_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
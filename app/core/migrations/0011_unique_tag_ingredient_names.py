@@ -0,0 +1,94 @@
+# Generated by Django 3.1 on 2026-10-17 04:40
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def merge_model_duplicates(apps, model_name, field_name):
+    """Merge the rows of model_name sharing a user and name into the oldest
+
+    Links of recipes to the merged rows are moved to the kept row, links
+    that would then be duplicated are dropped. Returns the affected recipes.
+    """
+    model = apps.get_model('core', model_name)
+    through = apps.get_model('core', 'Recipe')._meta.get_field(
+        field_name
+    ).remote_field.through
+    column = f'{model_name.lower()}_id'
+
+    groups = model.objects.values('user', 'name').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+
+    recipe_ids = set()
+    for group in groups.iterator():
+        ids = list(model.objects.filter(
+            user=group['user'],
+            name=group['name']
+        ).order_by('id').values_list('id', flat=True))
+        kept, merged = ids[0], ids[1:]
+
+        linked = set(through.objects.filter(**{column: kept}).values_list(
+            'recipe_id',
+            flat=True
+        ))
+        moved, dropped = [], []
+        for link_id, recipe_id in through.objects.filter(**{
+            f'{column}__in': merged
+        }).values_list('id', 'recipe_id'):
+            recipe_ids.add(recipe_id)
+            if recipe_id in linked:
+                dropped.append(link_id)
+            else:
+                linked.add(recipe_id)
+                moved.append(link_id)
+
+        through.objects.filter(id__in=dropped).delete()
+        through.objects.filter(id__in=moved).update(**{column: kept})
+        model.objects.filter(id__in=merged).delete()
+
+    return recipe_ids
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge duplicated tags and ingredients before making names unique"""
+    recipe_ids = merge_model_duplicates(apps, 'Tag', 'tags')
+    recipe_ids |= merge_model_duplicates(apps, 'Ingredient', 'ingredients')
+
+    # The related ids of those recipes changed, invalidate their ETags
+    apps.get_model('core', 'Recipe').objects.filter(
+        id__in=recipe_ids
+    ).update(updated_at=timezone.now())
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # Run the deferred foreign key checks of the deleted rows now,
+        # ALTER TABLE refuses tables with pending trigger events
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='core_ingredient_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_user_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+    ]
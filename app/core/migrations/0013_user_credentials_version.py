@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-17 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='credentials_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
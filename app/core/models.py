@@ -1,6 +1,8 @@
 import uuid
 import os
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
@@ -42,11 +44,31 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Moves when the password changes, not when its hash is upgraded, so
+    # signed tokens are revoked by password changes only
+    credentials_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self.credentials_version += 1
+
+    def set_unusable_password(self):
+        super().set_unusable_password()
+        self.credentials_version += 1
+
+    def check_password(self, raw_password):
+        """Return whether raw_password is correct, upgrading the hash"""
+        def setter(raw_password):
+            self.password = make_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return check_password(raw_password, self.password, setter)
+
 
 class Tag(models.Model):
     """Tag to be used for a recipe"""
@@ -55,6 +77,22 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # The unique index also serves lookups and ordering by name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_tag_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,6 +105,22 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # The unique index also serves lookups and ordering by name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_ingr_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -85,6 +139,45 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Resized copies of image built by recipe.images, keyed by variant name
+    image_variants = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by core.search on PostgreSQL only, see signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes'],
+                name='core_recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price'],
+                name='core_recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_recipe_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RevokedToken(models.Model):
+    """Session of signed API tokens revoked before it expired"""
+    session = models.CharField(max_length=32, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    # Past this time the session's tokens are expired anyway
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.session
@@ -0,0 +1,237 @@
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from rest_framework.fields import Field
+
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request being served, copied into the ORM executor
+_profile = contextvars.ContextVar('profile', default=None)
+
+
+def profiling_settings():
+    options = getattr(settings, 'PROFILING', {})
+    return {
+        'ENABLED': options.get('ENABLED', False),
+        'DUPLICATE_QUERIES': options.get('DUPLICATE_QUERIES', 3),
+        'STACK_DEPTH': options.get('STACK_DEPTH', 8),
+        'METRICS_ALLOWED_IPS': options.get('METRICS_ALLOWED_IPS', []),
+    }
+
+
+def _query_origin(depth):
+    """Return the serializer field running the current query and the stack
+
+    The field is the innermost one of the frames, the stack lists the last
+    depth frames of the project's code.
+    """
+    field = None
+    frame = sys._getframe(2)
+    while frame is not None and field is None:
+        candidate = frame.f_locals.get('self')
+        if isinstance(candidate, Field) and candidate.field_name:
+            parent = type(candidate.parent).__name__
+            field = f'{parent}.{candidate.field_name}'
+        frame = frame.f_back
+
+    stack = [
+        entry for entry in traceback.extract_stack()[:-2]
+        if entry.filename.startswith(str(settings.BASE_DIR))
+        and entry.filename != __file__
+    ]
+
+    return field, ''.join(traceback.format_list(stack[-depth:]))
+
+
+class Profile:
+    """Measurements of the request being served"""
+
+    def __init__(self, duplicate_threshold, stack_depth):
+        self.duplicate_threshold = duplicate_threshold
+        self.stack_depth = stack_depth
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.sections = defaultdict(float)
+        self.statements = Counter()
+        self.duplicates = {}
+
+    def add_query(self, sql, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        self.statements[sql] += 1
+        if self.statements[sql] == self.duplicate_threshold:
+            self.duplicates[sql] = _query_origin(self.stack_depth)
+
+    def duplicate_count(self):
+        """Return the queries repeating a statement already run"""
+        return sum(
+            self.statements[sql] - 1 for sql in self.duplicates
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries of profiled requests"""
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """Record the queries of every current and future connection"""
+    connection_created.connect(
+        install_query_recorder,
+        dispatch_uid='core.profiling'
+    )
+    for connection in connections.all():
+        install_query_recorder(connection)
+
+
+@contextmanager
+def profile_section(name):
+    """Time the block as the named section of the profiled request"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.sections[name] += time.perf_counter() - start
+
+
+@contextmanager
+def profiling():
+    """Profile the requests served in the block, yield the Profile"""
+    options = profiling_settings()
+    profile = Profile(
+        options['DUPLICATE_QUERIES'],
+        options['STACK_DEPTH']
+    )
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+class ProfiledSerializerMixin:
+    """Times serializer.data as the serialization of profiled requests"""
+
+    @property
+    def data(self):
+        with profile_section('serialize'):
+            return super().data
+
+
+# Totals kept per view, in the order of the exposed metrics
+METRICS = (
+    ('requests', 'Requests served'),
+    ('seconds', 'Wall time serving requests in seconds'),
+    ('sql_queries', 'SQL queries run'),
+    ('sql_seconds', 'Time running SQL queries in seconds'),
+    ('serialize_seconds', 'Time serializing and rendering in seconds'),
+    ('response_bytes', 'Size of the response bodies in bytes'),
+    ('duplicate_queries', 'SQL queries repeating a statement, N+1 hints'),
+)
+
+
+class ViewStats:
+    """Aggregated measurements per view and method"""
+
+    def __init__(self):
+        self._totals = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, view, method, profile, seconds, size):
+        with self._lock:
+            totals = self._totals[(view, method)]
+            totals['requests'] += 1
+            totals['seconds'] += seconds
+            totals['sql_queries'] += profile.sql_count
+            totals['sql_seconds'] += profile.sql_seconds
+            totals['serialize_seconds'] += profile.sections['serialize']
+            totals['response_bytes'] += size
+            totals['duplicate_queries'] += profile.duplicate_count()
+
+    def totals(self):
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+    def clear(self):
+        with self._lock:
+            self._totals.clear()
+
+
+view_stats = ViewStats()
+
+
+def report_duplicates(view, profile):
+    """Log the statements repeated by a request with their origin"""
+    for sql, (field, stack) in profile.duplicates.items():
+        logger.warning(
+            'Duplicate query in %s, run %d times from %s: %s\n%s',
+            view,
+            profile.statements[sql],
+            field or 'outside serializer fields',
+            sql,
+            stack
+        )
+
+
+def is_staff(request):
+    """Return whether the request was made by an authenticated staff user"""
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def prometheus_text():
+    """Return the view and response cache metrics in Prometheus format"""
+    from recipe.cache import response_cache
+
+    lines = []
+    totals = view_stats.totals()
+    for name, description in METRICS:
+        metric = f'api_{name}_total'
+        lines.append(f'# HELP {metric} {description}.')
+        lines.append(f'# TYPE {metric} counter')
+        for (view, method), values in sorted(totals.items()):
+            lines.append(
+                f'{metric}{{view="{_label(view)}",method="{method}"}} '
+                f'{values.get(name, 0):g}'
+            )
+
+    for name, value in response_cache.stats().items():
+        metric = f'response_cache_{name}_total'
+        lines.append(f'# HELP {metric} Response cache {name}.')
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+
+    return '\n'.join(lines) + '\n'
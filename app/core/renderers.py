@@ -0,0 +1,130 @@
+import csv
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from core.profiling import profile_section
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed
+
+    The output matches JSONRenderer's except for floats: exponents are
+    written without sign or padding, 1e16 for 1e+16 and 1e-7 for 1e-07,
+    and NaN and infinities become null where JSONRenderer raises
+    ValueError. Both are valid JSON and decode to the same values, the API
+    renders prices as strings. JSONRenderer is used instead for indented
+    or ASCII-only output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with profile_section('serialize'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or data is None or indent is not None
+                or not self.compact or self.ensure_ascii):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers above 64 bits, which json handles
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape U+2028 and U+2029 like JSONRenderer does
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson when it is installed"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a list of objects as newline delimited JSON"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def stream(self, chunks):
+        """Yield the lines of each chunk of objects as one bytestring"""
+        encoder = FastJSONRenderer()
+        for chunk in chunks:
+            yield b''.join(encoder.render(item) + b'\n' for item in chunk)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(self.stream([data]))
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders a list of flat objects as CSV with a header row"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def stream(self, chunks, header=None):
+        """Yield the header, then the rows of each chunk of objects
+
+        The header defaults to the keys of the first object.
+        """
+        writer = csv.writer(_Echo())
+        if header is not None:
+            yield writer.writerow(header).encode(self.charset)
+
+        for chunk in chunks:
+            lines = []
+            if header is None and chunk:
+                header = list(chunk[0])
+                lines.append(writer.writerow(header))
+            for item in chunk:
+                lines.append(writer.writerow(
+                    [item.get(name) for name in header]
+                ))
+            yield ''.join(lines).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(self.stream([data]))
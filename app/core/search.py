@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connections, router
+from django.db.models import OuterRef, Subquery
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def _names(model):
+    """Return a subquery joining the names of a recipe's related objects"""
+    return Subquery(
+        model.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(
+            names=StringAgg('name', ' ')
+        ).values('names')
+    )
+
+
+def search_enabled():
+    """Return whether the recipe search vectors are maintained"""
+    connection = connections[router.db_for_write(Recipe)]
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipes):
+    """Recompute the stored search vector of the given recipes
+
+    recipes is a queryset or a list of recipe ids. Titles weigh more than
+    tag names, which weigh more than ingredient names.
+    """
+    if not search_enabled():
+        return
+
+    config = settings.RECIPE_SEARCH_CONFIG
+    Recipe.objects.filter(pk__in=recipes).update(
+        search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector(_names(Tag), weight='B', config=config) +
+            SearchVector(_names(Ingredient), weight='C', config=config)
+        )
+    )
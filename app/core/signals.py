@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_tokens, invalidate_user
+from core.bulk import bulk_saved
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+
+
+# Recipe fields linking to each recipe attribute model
+RECIPE_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token as soon as it is deleted"""
+    invalidate_tokens(instance.key)
+
+
+# User fields deciding whether the tokens of a user authenticate
+TOKEN_USER_FIELDS = {'is_active', 'password', 'credentials_version'}
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, update_fields,
+                           **kwargs):
+    """Drop cached tokens of a changed user, e.g. when deactivated"""
+    if created:
+        return
+
+    invalidate_user(instance.pk)
+    # Saves of other fields only, like last_login, leave the tokens valid
+    if update_fields is not None and not TOKEN_USER_FIELDS & update_fields:
+        return
+    invalidate_tokens(
+        *Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_deleted_user(sender, instance, **kwargs):
+    """Stop authenticating a deleted user from the cache"""
+    invalidate_user(instance.pk)
+
+
+def linked_recipes(sender, instance):
+    """Return the ids of the recipes linked to a tag or ingredient"""
+    return list(
+        Recipe.objects.filter(**{RECIPE_FIELDS[sender]: instance})
+        .values_list('pk', flat=True)
+    )
+
+
+def recipes_changed(recipe_ids):
+    """Mark recipes whose representation changed indirectly as updated"""
+    if not recipe_ids:
+        return
+
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    update_search_vectors(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """Index the title of a saved recipe"""
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_recipes(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Track the tags and ingredients linked to recipes"""
+    if reverse and action == 'pre_clear':
+        instance._cleared_recipe_ids = linked_recipes(type(instance), instance)
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    elif not reverse:
+        recipes_changed([instance.pk])
+    elif action == 'post_clear':
+        recipes_changed(getattr(instance, '_cleared_recipe_ids', []))
+    else:
+        recipes_changed(list(pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_renamed_recipes(sender, instance, created, **kwargs):
+    """Track the new name of a tag or ingredient in its recipes"""
+    if not created:
+        recipes_changed(linked_recipes(sender, instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_unlinked_recipes(sender, instance, **kwargs):
+    """Remember the recipes a deleted tag or ingredient is linked to"""
+    instance._linked_recipe_ids = linked_recipes(sender, instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_unlinked_recipes(sender, instance, **kwargs):
+    """Track the removal of a deleted tag or ingredient from its recipes"""
+    recipes_changed(getattr(instance, '_linked_recipe_ids', []))
+
+
+@receiver(bulk_saved, sender=Recipe)
+def update_bulk_search_vectors(sender, instances, **kwargs):
+    """Index recipes written in bulk"""
+    update_search_vectors([instance.pk for instance in instances])
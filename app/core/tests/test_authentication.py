@@ -0,0 +1,277 @@
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase, RequestFactory, override_settings
+
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from core import tokens
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication, token_cache,
+    user_cache, _build_user_cache
+)
+from core.cache import LRUCache, TieredCache
+from core.models import RevokedToken
+
+
+def auth_request(token, keyword='Token'):
+    """Return a request carrying the given token"""
+    return RequestFactory().get('/', HTTP_AUTHORIZATION=f'{keyword} {token}')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def test_authenticate_warm_cache_without_queries(self):
+        """Test a cached token authenticates without querying"""
+        self.authentication.authenticate(auth_request(self.token.key))
+
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate(
+                auth_request(self.token.key)
+            )
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected and not cached"""
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate(auth_request('invalid'))
+
+        self.assertIsNone(token_cache.get('invalid'))
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token stops it authenticating"""
+        self.authentication.authenticate(auth_request(self.token.key))
+        self.token.delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate(auth_request(self.token.key))
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user stops their token authenticating"""
+        self.authentication.authenticate(auth_request(self.token.key))
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate(auth_request(self.token.key))
+
+    def test_unrelated_user_save_skips_token_lookup(self):
+        """Test saving fields tokens don't depend on runs no token query"""
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+        with self.assertNumQueries(2):
+            self.user.save(update_fields=['is_active'])
+
+    def test_returned_user_is_a_copy(self):
+        """Test changing the returned user leaves the cache untouched"""
+        user, _ = self.authentication.authenticate(
+            auth_request(self.token.key)
+        )
+        user.name = 'Changed'
+
+        user, _ = self.authentication.authenticate(
+            auth_request(self.token.key)
+        )
+        self.assertEqual(user.name, '')
+
+
+@override_settings(SIGNED_TOKENS={
+    'TTL': 3600,
+    'MAX_AGE': 7200,
+    'DENYLIST_SYNC_INTERVAL': 30,
+})
+class SignedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.token, _ = tokens.issue_token(self.user)
+        self.authentication = SignedTokenAuthentication()
+
+    def authenticate(self, token=None):
+        return self.authentication.authenticate(
+            auth_request(token or self.token, 'Bearer')
+        )
+
+    def test_authenticate_warm_process_without_queries(self):
+        """Test a signed token authenticates without querying once warm"""
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            user, payload = self.authenticate()
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(payload['u'], self.user.pk)
+
+    def test_other_keywords_ignored(self):
+        """Test legacy tokens are left to the other authentications"""
+        self.assertIsNone(
+            self.authentication.authenticate(auth_request(self.token))
+        )
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a changed payload is rejected"""
+        _, signature = self.token.split(':', 1)
+        forged = tokens.issue_token(
+            get_user_model().objects.create_user('other@server.com')
+        )[0].split(':', 1)[0]
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(f'{forged}:{signature}')
+
+    def test_expired_token_rejected(self):
+        """Test a token is rejected once its TTL passed"""
+        with override_settings(SIGNED_TOKENS={'TTL': -1}):
+            with self.assertRaisesMessage(
+                    exceptions.AuthenticationFailed,
+                    'Token expired.'):
+                self.authenticate()
+
+    def test_refresh_keeps_session_age(self):
+        """Test refreshed tokens expire with the session they continue"""
+        _, payload = self.authenticate()
+        token, expires = tokens.issue_token(self.user, payload)
+
+        self.assertLessEqual(expires.timestamp(), payload['i'] + 7200)
+        with override_settings(SIGNED_TOKENS={'TTL': 3600, 'MAX_AGE': -1}):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self.authenticate(token)
+
+    def test_revoked_session_rejected(self):
+        """Test revoking a token also revokes the tokens refreshed from it"""
+        _, payload = self.authenticate()
+        refreshed, _ = tokens.issue_token(self.user, payload)
+        tokens.revoke_token(payload)
+
+        for token in (self.token, refreshed):
+            with self.assertRaisesMessage(
+                    exceptions.AuthenticationFailed,
+                    'Token revoked.'):
+                self.authenticate(token)
+
+    def test_denylist_syncs_revocations_on_interval(self):
+        """Test sessions revoked by other processes are synced"""
+        _, payload = self.authenticate()
+        RevokedToken.objects.create(
+            session=payload['s'],
+            user=self.user,
+            expires_at=tokens._datetime(payload['i'] + 7200)
+        )
+
+        self.authenticate()
+        tokens.denylist.sync()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_revokes_tokens(self):
+        """Test changing the password invalidates the issued tokens"""
+        self.authenticate()
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_rehashed_password_keeps_tokens(self):
+        """Test upgrading the password hash on login keeps other tokens"""
+        password = self.user.password
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000}):
+            self.assertEqual(
+                authenticate(username='test@server.com', password='pass123'),
+                self.user
+            )
+
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, password)
+        user, _ = self.authenticate()
+        self.assertEqual(user, self.user)
+
+    @override_settings(
+        AUTH_TOKEN_CACHE={'TTL': 300, 'LOCAL_TTL': 60},
+        SIGNED_TOKENS={'DENYLIST_SYNC_INTERVAL': 5}
+    )
+    def test_users_cached_no_longer_than_denylist_interval(self):
+        """Test other processes see user changes like revocations"""
+        self.assertEqual(_build_user_cache().local.ttl, 5)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user stops their tokens authenticating"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+
+class LRUCacheTests(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache drops the oldest entry when full"""
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test entries are dropped once their TTL passed"""
+        monotonic.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.set('a', 1)
+
+        monotonic.return_value = 109
+        self.assertEqual(cache.get('a'), 1)
+        monotonic.return_value = 110
+        self.assertIsNone(cache.get('a'))
+
+
+class TieredCacheTests(TestCase):
+
+    @patch('core.cache.time.monotonic')
+    def test_other_process_deletes_seen_after_local_ttl(self, monotonic):
+        """Test a key deleted by a process expires in the others' tier"""
+        monotonic.return_value = 100
+        worker1 = TieredCache(
+            'test',
+            ttl=300,
+            local_ttl=10,
+            shared_alias='default'
+        )
+        worker2 = TieredCache(
+            'test',
+            ttl=300,
+            local_ttl=10,
+            shared_alias='default'
+        )
+        worker1.set('key', 1)
+        self.assertEqual(worker2.get('key'), 1)
+
+        worker1.delete('key')
+        self.assertIsNone(worker1.get('key'))
+        self.assertEqual(worker2.get('key'), 1)
+
+        monotonic.return_value = 110
+        self.assertIsNone(worker2.get('key'))
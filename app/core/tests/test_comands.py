@@ -1,23 +1,186 @@
+import json
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import health
+from core.health import backoff_delays
+from core.models import Recipe, Tag
+
 
 class ComandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count, 1)
+        with patch('core.health.check_database') as check:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEquals(check.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count, 6)
+        """Test waiting for db retries with growing delays"""
+        with patch('core.health.check_database') as check:
+            check.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEquals(check.call_count, 6)
+            self.assertEquals(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test waiting for db fails once the deadline passed"""
+        with patch('core.health.check_database') as check:
+            check.side_effect = OperationalError('refused')
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    def test_wait_for_db_checks_migrations(self):
+        """Test the database is really queried, migrations included"""
+        health._migrated_aliases.discard('default')
+        stdout = StringIO()
+        with patch(
+            'core.health.MigrationExecutor',
+            wraps=health.MigrationExecutor
+        ) as executor:
+            call_command('wait_for_db', check_migrations=True, stdout=stdout)
+
+        executor.assert_called_once()
+        self.assertIn('default', health._migrated_aliases)
+        self.assertIn('Database available!', stdout.getvalue())
+
+    def test_backoff_delays_grow_up_to_cap(self):
+        """Test the jittered backoff delays stay within growing bounds"""
+        delays = backoff_delays(base=1, cap=4)
+        for bound in (1, 2, 4, 4, 4):
+            self.assertLessEqual(next(delays), bound)
+
+    def test_seed_recipes(self):
+        """Test seeding users with recipes linked to tags"""
+        call_command(
+            'seed_recipes',
+            users=2,
+            recipes=5,
+            tags=3,
+            ingredients=4,
+            links=2,
+            batch_size=2,
+            stdout=StringIO()
+        )
+
+        user = get_user_model().objects.get(email='bench1@bench.local')
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 5)
+        self.assertEqual(Tag.objects.filter(user=user).count(), 3)
+        for recipe in Recipe.objects.filter(user=user):
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_recipes(self):
+        """Test importing recipes reusing existing tags by name"""
+        user = get_user_model().objects.create_user('i@server.com', 'pass')
+        Tag.objects.create(user=user, name='Vegan')
+        lines = [
+            {'title': 'Soup', 'time_minutes': 10, 'price': '2.50',
+             'tags': ['Vegan', 'Dinner'], 'ingredients': ['Leek']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': '3.00',
+             'tags': ['Vegan']},
+            {'title': 'Broken', 'time_minutes': 'soon', 'price': '1.00'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as upload:
+            upload.write('\n'.join(json.dumps(line) for line in lines))
+            upload.write('\n{not json\n')
+            upload.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command(
+                'import_recipes',
+                upload.name,
+                user='i@server.com',
+                batch_size=2,
+                stdout=stdout,
+                stderr=stderr
+            )
+
+        self.assertIn('created 2 recipes, 2 rows rejected', stdout.getvalue())
+        self.assertIn('Line 3:', stderr.getvalue())
+        self.assertIn('Line 4:', stderr.getvalue())
+        self.assertEqual(Tag.objects.filter(user=user).count(), 2)
+        soup = Recipe.objects.get(user=user, title='Soup')
+        self.assertEqual(
+            sorted(soup.tags.values_list('name', flat=True)),
+            ['Dinner', 'Vegan']
+        )
+        self.assertEqual(soup.ingredients.get().name, 'Leek')
+
+    def test_import_recipes_undecodable_file(self):
+        """Test importing a file that isn't UTF-8 fails the command"""
+        get_user_model().objects.create_user('i@server.com', 'pass')
+        with tempfile.NamedTemporaryFile(suffix='.csv') as upload:
+            upload.write('title\nCr\xe8me br\xfbl\xe9e\n'.encode('latin-1'))
+            upload.flush()
+            with self.assertRaisesRegex(CommandError, 'Unreadable file'):
+                call_command(
+                    'import_recipes',
+                    upload.name,
+                    user='i@server.com',
+                    stdout=StringIO(),
+                    stderr=StringIO()
+                )
+
+    def test_benchmark_writes_json(self):
+        """Test benchmarking the API records stats and keeps the data"""
+        call_command(
+            'seed_recipes',
+            recipes=3,
+            tags=2,
+            ingredients=2,
+            links=1,
+            stdout=StringIO()
+        )
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'benchmark',
+                'api',
+                repeat=2,
+                json_path=output.name,
+                stdout=StringIO()
+            )
+            results = json.load(output)
+
+        self.assertEqual(results['meta']['recipes'], 3)
+        self.assertEqual(
+            set(results['scenarios']['api']),
+            {'list', 'filter', 'detail', 'create', 'upload_image'}
+        )
+        for stats in results['scenarios']['api'].values():
+            self.assertGreater(stats['throughput'], 0)
+            self.assertGreater(stats['queries'], 0)
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertFalse(Recipe.objects.exclude(image='').exists())
+
+    def test_benchmark_fails_on_regression(self):
+        """Test running more queries than the baseline fails the run"""
+        call_command(
+            'seed_recipes',
+            recipes=3,
+            tags=2,
+            ingredients=2,
+            links=1,
+            stdout=StringIO()
+        )
+        baseline = {'scenarios': {'api': {
+            'detail': {'p50': 10 ** 6, 'queries': 1, 'throughput': 0},
+        }}}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as stored:
+            json.dump(baseline, stored)
+            stored.flush()
+            with self.assertRaisesRegex(CommandError, r'api\.detail: \d+ q'):
+                call_command(
+                    'benchmark',
+                    'api',
+                    repeat=2,
+                    baseline=stored.name,
+                    stdout=StringIO()
+                )
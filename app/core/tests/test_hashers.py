@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import hashers
+from django.test import TestCase, override_settings
+
+from core import hashers as core_hashers
+
+
+ARGON2_HASHERS = [
+    'core.hashers.Argon2PasswordHasher',
+    'core.hashers.PBKDF2PasswordHasher',
+]
+
+
+class PasswordHashingTests(TestCase):
+
+    def setUp(self):
+        core_hashers.credential_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+
+    def login(self, password='pass123'):
+        return authenticate(username='test@server.com', password=password)
+
+    def test_login_rehashes_with_preferred_hasher(self):
+        """Test a successful login upgrades the hash to the new hasher"""
+        with override_settings(PASSWORD_HASHERS=ARGON2_HASHERS):
+            self.assertEqual(self.login(), self.user)
+
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('argon2$'))
+            self.assertEqual(self.login(), self.user)
+
+    def test_login_rehashes_with_tuned_iterations(self):
+        """Test changing the iterations rehashes on the next login"""
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000}):
+            self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(
+            self.user.password.startswith('pbkdf2_sha256$1000$')
+        )
+
+    def test_failed_login_keeps_hash(self):
+        """Test a wrong password neither logs in nor rehashes"""
+        password = self.user.password
+
+        with override_settings(PASSWORD_HASHERS=ARGON2_HASHERS):
+            self.assertIsNone(self.login('wrong'))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+    def test_repeated_login_skips_hashing(self):
+        """Test a remembered credential is checked without hashing"""
+        self.login()
+
+        with patch.object(
+            hashers,
+            'check_password',
+            wraps=hashers.check_password
+        ) as check_password:
+            self.assertEqual(self.login(), self.user)
+            self.assertIsNone(self.login('wrong'))
+
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_password_change_forgets_credential(self):
+        """Test the old password stops working once changed"""
+        self.login()
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        self.assertIsNone(self.login())
+        self.assertEqual(self.login('newpass123'), self.user)
+
+    def test_inactive_user_cannot_login(self):
+        """Test a remembered credential doesn't log inactive users in"""
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(self.login())
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core.health import NotReady
+
+
+HEALTH_URL = reverse('health')
+
+
+class HealthEndpointTests(TestCase):
+
+    def test_healthy(self):
+        """Test the endpoint answers 200 when the database answers"""
+        res = self.client.get(HEALTH_URL, {'migrations': '1'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_database_unavailable(self):
+        """Test the endpoint answers 503 when the database is down"""
+        with patch('core.views.check_database') as check:
+            check.side_effect = OperationalError(
+                'could not connect to server at "db.internal"'
+            )
+            with self.assertLogs('core.views', 'WARNING'):
+                res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {
+            'status': 'unavailable',
+            'detail': 'Database unavailable.',
+        })
+
+    def test_migrations_pending(self):
+        """Test the endpoint answers 503 when migrations are missing"""
+        with patch('core.views.check_database') as check:
+            check.side_effect = NotReady('2 migrations are not applied.')
+            res = self.client.get(HEALTH_URL, {'migrations': '1'})
+
+        self.assertEqual(res.status_code, 503)
+        check.assert_called_once_with(check_migrations=True)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class UniqueNamesMigrationTests(TransactionTestCase):
+    """Tests the migration making tag and ingredient names unique"""
+    migrate_from = [('core', '0010_updated_at')]
+    migrate_to = [('core', '0011_unique_tag_ingredient_names')]
+
+    def migrate(self, targets):
+        """Migrate to targets and return the apps of that state"""
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_merged(self):
+        """Test duplicated names are merged into the oldest with links"""
+        apps = self.migrate(self.migrate_from)
+        Tag = apps.get_model('core', 'Tag')
+        Ingredient = apps.get_model('core', 'Ingredient')
+        Recipe = apps.get_model('core', 'Recipe')
+        user = apps.get_model('core', 'User').objects.create(
+            email='test@server.com'
+        )
+        vegan, vegan_copy, spicy = (
+            Tag.objects.create(user=user, name=name)
+            for name in ('Vegan', 'Vegan', 'Spicy')
+        )
+        salt, salt_copy = (
+            Ingredient.objects.create(user=user, name='Salt')
+            for _ in range(2)
+        )
+        curry, salad = (
+            Recipe.objects.create(
+                user=user,
+                title=title,
+                time_minutes=10,
+                price='5.00'
+            )
+            for title in ('Curry', 'Salad')
+        )
+        curry.tags.add(vegan, vegan_copy, spicy)
+        salad.tags.add(vegan_copy)
+        salad.ingredients.add(salt_copy)
+
+        apps = self.migrate(self.migrate_to)
+        Tag = apps.get_model('core', 'Tag')
+        Recipe = apps.get_model('core', 'Recipe')
+
+        self.assertEqual(
+            sorted(Tag.objects.values_list('id', 'name')),
+            [(vegan.id, 'Vegan'), (spicy.id, 'Spicy')]
+        )
+        self.assertEqual(
+            list(apps.get_model('core', 'Ingredient').objects.values_list(
+                'id',
+                flat=True
+            )),
+            [salt.id]
+        )
+        curry = Recipe.objects.get(id=curry.id)
+        salad = Recipe.objects.get(id=salad.id)
+        self.assertEqual(
+            sorted(curry.tags.values_list('id', flat=True)),
+            [vegan.id, spicy.id]
+        )
+        self.assertEqual(
+            list(salad.tags.values_list('id', flat=True)),
+            [vegan.id]
+        )
+        self.assertEqual(
+            list(salad.ingredients.values_list('id', flat=True)),
+            [salt.id]
+        )
@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.healthy = True
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql):
+                if not connection.healthy:
+                    raise psycopg2.OperationalError('server closed')
+
+        return Cursor()
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.opened = []
+        self.pool = ConnectionPool(self.connect, max_size=2, timeout=0.01)
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def test_returned_connection_is_reused(self):
+        """Test a returned connection is handed out again"""
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+
+        self.assertIs(self.pool.checkout(), connection)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_max_size_times_out(self):
+        """Test checkouts beyond the max size fail after the timeout"""
+        self.pool.checkout()
+        self.pool.checkout()
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.checkout()
+
+    def test_open_transaction_rolled_back_on_checkin(self):
+        """Test a connection is returned without its open transaction"""
+        connection = self.pool.checkout()
+        connection.status = extensions.TRANSACTION_STATUS_INERROR
+
+        self.pool.checkin(connection)
+
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertIs(self.pool.checkout(), connection)
+
+    def test_broken_connection_discarded(self):
+        """Test closed connections free their slot instead of returning"""
+        connection = self.pool.checkout()
+        connection.close()
+
+        self.pool.checkin(connection)
+
+        self.assertEqual(self.pool.size, 0)
+        self.assertIsNot(self.pool.checkout(), connection)
+
+    def test_unhealthy_idle_connection_replaced(self):
+        """Test idle connections failing the ping are replaced"""
+        self.pool.check_interval = 0
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        connection.healthy = False
+
+        replacement = self.pool.checkout()
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_idle_connections_above_min_size_expire(self):
+        """Test connections idle past max_idle are closed down to min_size"""
+        self.pool.max_idle = 0
+        first = self.pool.checkout()
+        second = self.pool.checkout()
+        self.pool.checkin(first)
+
+        with patch('core.db.pool.time.monotonic', return_value=1e9):
+            self.pool.checkin(second)
+
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(self.pool.size, 1)
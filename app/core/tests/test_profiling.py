@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.models import Recipe, Tag
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+@override_settings(PROFILING={'ENABLED': True, 'DUPLICATE_QUERIES': 2})
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        profiling.view_stats.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'{title} tag')
+            )
+
+    def test_requests_measured_per_view(self):
+        """Test views are measured and exposed as Prometheus metrics"""
+        self.user.is_staff = True
+        self.user.save()
+        resource = self.client.get(RECIPE_URL)
+        self.assertIn('sql;dur=', resource['Server-Timing'])
+
+        self.client.force_login(self.user)
+        resource = self.client.get(METRICS_URL)
+        metrics = resource.content.decode()
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertTrue(resource['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            'api_requests_total{view="recipe:recipe-list",method="GET"} 1',
+            metrics
+        )
+        self.assertIn(
+            'api_sql_queries_total{view="recipe:recipe-list"',
+            metrics
+        )
+        self.assertIn('response_cache_misses_total', metrics)
+
+    def test_measurements_hidden_from_other_users(self):
+        """Test only staff and allowed addresses see the measurements"""
+        resource = self.client.get(RECIPE_URL)
+        self.assertNotIn('Server-Timing', resource)
+
+        self.client.force_login(self.user)
+        resource = self.client.get(METRICS_URL)
+        self.assertEqual(resource.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.logout()
+        with override_settings(PROFILING={
+            'ENABLED': True,
+            'METRICS_ALLOWED_IPS': ['127.0.0.1'],
+        }):
+            resource = self.client.get(METRICS_URL)
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+
+    def test_duplicate_queries_traced_to_serializer_field(self):
+        """Test repeated statements are flagged with the field running them"""
+        profiling.install()
+
+        with profiling.profiling() as profile:
+            RecipeDetailSerializer(Recipe.objects.all(), many=True).data
+
+        origins = [field for field, _ in profile.duplicates.values()]
+        self.assertIn('RecipeDetailSerializer.tags', origins)
+        self.assertGreater(profile.duplicate_count(), 0)
+        self.assertGreater(profile.sections['serialize'], 0)
+
+    @override_settings(PROFILING={'ENABLED': False})
+    def test_disabled_profiling(self):
+        """Test disabled profiling measures nothing and hides the metrics"""
+        resource = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', resource)
+        self.assertEqual(profiling.view_stats.totals(), {})
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
@@ -0,0 +1,94 @@
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+
+SAMPLE = {
+    'title': 'Caf\u00e9 \u2028\u2029 "quoted"',
+    'price': Decimal('12.50'),
+    'created': datetime.datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+    'day': datetime.date(2020, 1, 2),
+    'uuid': uuid.UUID(int=1),
+    'lazy': gettext_lazy('Object not found.'),
+    'nested': [{'id': 1, 'tags': [1, 2]}, None, True, 1.5],
+    1: 'integer key',
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_output_identical_to_json_renderer(self):
+        """Test the fast renderer writes the same bytes as JSONRenderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE)
+        )
+
+    @skipUnless(orjson, 'orjson is not installed')
+    def test_float_differences(self):
+        """Test floats differ from JSONRenderer in exponents and NaN only"""
+        data = [1e16, 1e-7]
+
+        self.assertEqual(FastJSONRenderer().render(data), b'[1e16,1e-7]')
+        self.assertEqual(JSONRenderer().render(data), b'[1e+16,1e-07]')
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+
+        self.assertEqual(
+            FastJSONRenderer().render([float('nan'), float('inf')]),
+            b'[null,null]'
+        )
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float('nan')])
+
+    def test_indented_output_identical(self):
+        """Test indented output falls back to JSONRenderer"""
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, renderer_context=context),
+            JSONRenderer().render(SAMPLE, renderer_context=context)
+        )
+
+    def test_without_orjson(self):
+        """Test the renderer still works when orjson is missing"""
+        with patch('core.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE))
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, body):
+        return FastJSONParser().parse(io.BytesIO(body))
+
+    def test_parse(self):
+        """Test JSON bodies are parsed"""
+        data = self.parse('{"title": "Café", "tags": [1, 2]}'.encode())
+
+        self.assertEqual(data, {'title': 'Café', 'tags': [1, 2]})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a parse error"""
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
+
+    def test_parse_without_orjson(self):
+        """Test the parser still works when orjson is missing"""
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(self.parse(b'[1, 2]'), [1, 2])
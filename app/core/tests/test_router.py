@@ -0,0 +1,131 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db import router as replica_router
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+
+# Users the fake view authenticates, two tokens belong to the same user
+TOKEN_USERS = {
+    'Token abc': get_user_model()(pk=1),
+    'Token device': get_user_model()(pk=1),
+    'Token other': get_user_model()(pk=2),
+}
+
+
+@override_settings(REPLICA_ROUTING={
+    'REPLICAS': ['replica0'],
+    'PIN_SECONDS': 5,
+    'PIN_CACHE': 'default',
+    'CHECK_INTERVAL': 10,
+    'CHECK_TIMEOUT': 2,
+})
+@patch('core.db.router.check_replica')
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        replica_router._replica_health.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(self.read_alias)
+
+    def read_alias(self, request):
+        """Authenticate like an API view and answer with the read alias"""
+        before = router.db_for_read(Recipe)
+        request.user = TOKEN_USERS.get(
+            request.META.get('HTTP_AUTHORIZATION'),
+            AnonymousUser()
+        )
+        status = 400 if request.path == '/invalid/' else 200
+        return HttpResponse(
+            f'{before} {router.db_for_read(Recipe)}',
+            status=status
+        )
+
+    def request(self, method='get', path='/', token='Token abc'):
+        request = getattr(self.factory, method)(
+            path,
+            HTTP_AUTHORIZATION=token
+        )
+        return self.middleware(request).content.decode().split()[1]
+
+    def test_reads_go_to_replica(self, check):
+        """Test safe requests read from the replica"""
+        self.assertEqual(self.request(), 'replica0')
+
+    def test_writes_stay_on_primary(self, check):
+        """Test unsafe requests read and write on the primary"""
+        self.assertEqual(self.request('post'), 'default')
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+    def test_reads_outside_requests_use_primary(self, check):
+        """Test commands and background work read from the primary"""
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_reads_before_authentication_use_primary(self, check):
+        """Test the replica is only chosen once the user is known"""
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token abc')
+
+        response = self.middleware(request).content.decode()
+
+        self.assertEqual(response, 'default replica0')
+
+    def test_anonymous_reads_go_to_replica(self, check):
+        """Test unauthenticated reads use the replica"""
+        self.assertEqual(self.request(token=''), 'replica0')
+
+    def test_user_pinned_after_write(self, check):
+        """Test a user reads from the primary right after writing"""
+        self.request('post')
+
+        self.assertEqual(self.request(), 'default')
+        self.assertEqual(self.request(token='Token device'), 'default')
+        self.assertEqual(self.request(token='Token other'), 'replica0')
+
+    def test_failed_write_does_not_pin(self, check):
+        """Test rejected writes keep the user on the replica"""
+        self.request('post', path='/invalid/')
+
+        self.assertEqual(self.request(), 'replica0')
+
+    def test_unhealthy_replica_falls_back_to_primary(self, check):
+        """Test reads use the primary while the replica is unhealthy"""
+        check.side_effect = OperationalError('refused')
+
+        self.assertEqual(self.request(), 'default')
+        self.assertEqual(self.request(), 'default')
+        self.assertEqual(check.call_count, 1)
+
+    @override_settings(WEB_WORKERS=2)
+    def test_workers_need_shared_pin_cache(self, check):
+        """Test replicas are refused when pins are local to each worker"""
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(self.read_alias)
+
+    def test_no_migrations_on_replica(self, check):
+        """Test migrations only run on the primary"""
+        self.assertFalse(router.allow_migrate('replica0', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+
+class ReplicaCheckTests(SimpleTestCase):
+
+    def test_replica_check_times_out(self):
+        """Test replica checks connect with the configured timeout"""
+        connection = connections['default']
+        with patch.object(connection, 'vendor', 'postgresql'), \
+                patch.object(connection, 'Database') as database:
+            replica_router.check_replica('default', 2)
+
+        params = database.connect.call_args.kwargs
+        self.assertEqual(params['connect_timeout'], 2)
+        database.connect.return_value.close.assert_called_once_with()
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.models import Recipe
+from core.throttling import LocalBuckets, SharedBuckets, parse_rate
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def throttle_rates(**rates):
+    """Return the REST_FRAMEWORK setting with the given scope rates"""
+    return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_parse_rate(self):
+        """Test rates give the bucket capacity and refill period"""
+        self.assertEqual(parse_rate('100/min'), (100, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+
+    def test_local_bucket_bursts_then_refills(self):
+        """Test a bucket allows its capacity at once then refills"""
+        buckets = LocalBuckets()
+
+        for _ in range(3):
+            self.assertEqual(buckets.take('a', 3, 60, now=100), 0)
+        self.assertAlmostEqual(buckets.take('a', 3, 60, now=100), 20)
+        self.assertEqual(buckets.take('b', 3, 60, now=100), 0)
+
+        self.assertEqual(buckets.take('a', 3, 60, now=120), 0)
+        self.assertGreater(buckets.take('a', 3, 60, now=120), 0)
+
+    def test_local_buckets_drop_least_recently_used(self):
+        """Test the least recently used buckets are forgotten past maxsize"""
+        buckets = LocalBuckets(maxsize=2)
+        buckets.take('a', 3, 60, now=100)
+        buckets.take('b', 3, 60, now=100)
+        buckets.take('a', 3, 60, now=100)
+        buckets.take('c', 3, 60, now=100)
+
+        self.assertEqual(set(buckets._full_at), {'a', 'c'})
+
+    def test_shared_buckets_count_per_window(self):
+        """Test the shared counters allow the capacity per period"""
+        cache.clear()
+        buckets = SharedBuckets('default')
+
+        for _ in range(2):
+            self.assertEqual(buckets.take('a', 2, 60, now=130), 0)
+        self.assertEqual(buckets.take('a', 2, 60, now=130), 50)
+        self.assertEqual(buckets.take('a', 2, 60, now=180), 0)
+
+
+@override_settings(REST_FRAMEWORK=throttle_rates(
+    read='2/min',
+    write='1/min',
+    upload='1/min',
+    upload_chunk='2/min'
+))
+class TokenBucketThrottleTests(TestCase):
+
+    def setUp(self):
+        throttling.local_buckets.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        throttling.local_buckets.clear()
+
+    def test_throttled_without_queries(self):
+        """Test a user past its rate is answered without any query"""
+        for _ in range(2):
+            self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            resource = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            resource.status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertIn('Retry-After', resource)
+
+    def test_scopes_throttled_separately(self):
+        """Test reads, writes and uploads have their own buckets"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+
+        responses = [
+            self.client.get(RECIPE_URL),
+            self.client.patch(
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                {'title': 'Changed'}
+            ),
+            self.client.post(upload_url, {}),
+        ]
+        for resource in responses:
+            self.assertNotEqual(
+                resource.status_code,
+                status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        resource = self.client.post(upload_url, {})
+        self.assertEqual(
+            resource.status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        resource = self.client.get(RECIPE_URL)
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+
+    def test_chunks_have_their_own_bucket(self):
+        """Test resumable upload chunks don't use the upload bucket"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        chunks_url = reverse(
+            'recipe:recipe-upload-image-chunk',
+            args=[recipe.id]
+        )
+
+        self.client.post(upload_url, {})
+        for _ in range(2):
+            resource = self.client.get(chunks_url)
+            self.assertEqual(resource.status_code, status.HTTP_200_OK)
+
+        resource = self.client.get(chunks_url)
+        self.assertEqual(
+            resource.status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    def test_users_throttled_separately(self):
+        """Test one user hitting its rate leaves others unaffected"""
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@server.com',
+            'pass123'
+        ))
+        resource = other.get(RECIPE_URL)
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
@@ -0,0 +1,161 @@
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return the capacity and refill period in seconds of a rate
+
+    Rates are written like DRF's, '100/min' is a bucket of 100 requests
+    refilled over a minute.
+    """
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class LocalBuckets:
+    """Token buckets of this process, without locks
+
+    A bucket is stored as the single time at which it will be full again,
+    the generic cell rate algorithm, so taking a token is a few dict
+    operations, each atomic under the GIL. Requests racing on the last
+    token of a bucket may both pass. Once more than maxsize buckets are
+    held the least recently used are dropped.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._full_at = OrderedDict()
+
+    def take(self, key, capacity, period, now):
+        """Take a token, return 0 or the seconds until one is available"""
+        interval = period / capacity
+        full_at = max(self._full_at.get(key, now), now) + interval
+        available_at = full_at - period
+        if available_at > now:
+            return available_at - now
+
+        # Reinserted to keep the buckets in least recently used order
+        self._full_at.pop(key, None)
+        self._full_at[key] = full_at
+        while len(self._full_at) > self.maxsize:
+            try:
+                self._full_at.popitem(last=False)
+            except KeyError:
+                # Emptied by another thread
+                break
+
+        return 0
+
+    def clear(self):
+        self._full_at.clear()
+
+
+class SharedBuckets:
+    """Request counters in a Django cache shared by every worker
+
+    Each bucket allows its capacity per period, counted with the cache's
+    atomic increments in fixed windows.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, capacity, period, now):
+        """Take a token, return 0 or the seconds until one is available"""
+        window = int(now // period)
+        cache_key = f'throttle:{key}:{window}'
+        cache = caches[self.alias]
+        cache.add(cache_key, 0, period + 1)
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:
+            # Expired between add() and incr(), the window is over
+            return 0
+
+        if count > capacity:
+            return (window + 1) * period - now
+
+        return 0
+
+
+def _build_buckets():
+    options = getattr(settings, 'THROTTLE', {})
+    local = LocalBuckets(options.get('MAXSIZE', 100000))
+    shared_alias = options.get('SHARED_CACHE')
+    shared = SharedBuckets(shared_alias) if shared_alias else None
+
+    return local, shared
+
+
+local_buckets, shared_buckets = _build_buckets()
+
+
+@receiver(setting_changed)
+def reset_buckets(setting, **kwargs):
+    global local_buckets, shared_buckets
+
+    if setting == 'THROTTLE':
+        local_buckets, shared_buckets = _build_buckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each user, or address when anonymous, with token buckets
+
+    Safe requests take from the 'read' scope and others from 'write',
+    unless the view's throttle_scopes maps its action to another scope.
+    Scope rates come from DEFAULT_THROTTLE_RATES, scopes without one are
+    not throttled. Buckets live in memory and, with a THROTTLE
+    SHARED_CACHE, in that cache too, so no request queries the database.
+    """
+    wait_seconds = 0
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        scope = scopes.get(getattr(view, 'action', None))
+        if scope is not None:
+            return scope
+
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+
+        return f'address:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        key = f'{scope}:{self.get_ident(request)}'
+        now = time.time()
+
+        self.wait_seconds = local_buckets.take(key, capacity, period, now)
+        if not self.wait_seconds and shared_buckets is not None:
+            self.wait_seconds = shared_buckets.take(
+                key,
+                capacity,
+                period,
+                now
+            )
+
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,139 @@
+import secrets
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import RevokedToken
+
+
+SALT = 'core.tokens'
+
+
+def token_settings():
+    options = getattr(settings, 'SIGNED_TOKENS', {})
+    return {
+        'TTL': options.get('TTL', 3600),
+        'MAX_AGE': options.get('MAX_AGE', 7 * 24 * 3600),
+        'DENYLIST_SYNC_INTERVAL': options.get('DENYLIST_SYNC_INTERVAL', 30),
+    }
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def issue_token(user, payload=None):
+    """Return a signed token for user and the time it expires
+
+    The token is valid for TTL seconds. Refreshing passes the payload of
+    the current token and continues its session, which ends MAX_AGE
+    seconds after the login that started it. Tokens carry the user's
+    credentials_version, changing the password revokes them.
+    """
+    options = token_settings()
+    now = int(time.time())
+    if payload is None:
+        session, started = secrets.token_hex(8), now
+    else:
+        session, started = payload['s'], payload['i']
+
+    token = signing.dumps({
+        'u': user.pk,
+        's': session,
+        'i': started,
+        'c': user.credentials_version,
+    }, salt=SALT)
+    expires = min(now + options['TTL'], started + options['MAX_AGE'])
+
+    return token, _datetime(expires)
+
+
+def read_token(token):
+    """Return the payload of a signed token, without any query
+
+    Raises signing.SignatureExpired when the token or its session expired
+    and signing.BadSignature when it was not issued by issue_token.
+    """
+    options = token_settings()
+    payload = signing.loads(token, salt=SALT, max_age=options['TTL'])
+    if payload['i'] + options['MAX_AGE'] < time.time():
+        raise signing.SignatureExpired('Token session expired')
+
+    return payload
+
+
+class Denylist:
+    """In-memory set of the revoked token sessions
+
+    The sessions revoked in the database and not expired yet are reloaded
+    by the first lookup after every interval seconds, other lookups don't
+    query. Sessions revoked by this process are added right away.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._sessions = frozenset()
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return (
+            self._synced_at is None
+            or time.monotonic() - self._synced_at >= self.interval
+        )
+
+    def _load(self):
+        self._sessions = frozenset(RevokedToken.objects.filter(
+            expires_at__gt=timezone.now()
+        ).values_list('session', flat=True))
+        self._synced_at = time.monotonic()
+
+    def sync(self):
+        """Reload the revoked sessions from the database"""
+        with self._lock:
+            self._load()
+
+    def add(self, session):
+        with self._lock:
+            self._sessions = self._sessions | {session}
+
+    def __contains__(self, session):
+        if self._stale():
+            with self._lock:
+                # Another thread may have synced while this one waited
+                if self._stale():
+                    self._load()
+
+        return session in self._sessions
+
+
+def _build_denylist():
+    return Denylist(token_settings()['DENYLIST_SYNC_INTERVAL'])
+
+
+denylist = _build_denylist()
+
+
+@receiver(setting_changed)
+def reset_denylist(setting, **kwargs):
+    global denylist
+
+    if setting == 'SIGNED_TOKENS':
+        denylist = _build_denylist()
+
+
+def revoke_token(payload):
+    """Revoke the session of a token payload, with every refreshed token"""
+    expires_at = _datetime(payload['i'] + token_settings()['MAX_AGE'])
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    RevokedToken.objects.get_or_create(
+        session=payload['s'],
+        defaults={'user_id': payload['u'], 'expires_at': expires_at}
+    )
+    denylist.add(payload['s'])
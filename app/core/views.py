@@ -0,0 +1,59 @@
+import logging
+
+from django.db.utils import OperationalError
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from core.health import NotReady, check_database
+from core.profiling import is_staff, profiling_settings, prometheus_text
+
+
+logger = logging.getLogger(__name__)
+
+
+@never_cache
+@require_safe
+def health(request):
+    """Report whether the database answers, ?migrations=1 checks those too"""
+    try:
+        check_database(
+            check_migrations=request.GET.get('migrations') == '1'
+        )
+    except (OperationalError, NotReady) as exc:
+        # The error may name the database host, only the logs get it
+        logger.warning('Health check failed: %s', exc)
+        detail = (
+            'Migrations are not applied.' if isinstance(exc, NotReady)
+            else 'Database unavailable.'
+        )
+        return JsonResponse(
+            {'status': 'unavailable', 'detail': detail},
+            status=503
+        )
+
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def metrics(request):
+    """Serve the profiling metrics in the Prometheus text format
+
+    Only staff users and the METRICS_ALLOWED_IPS, e.g. a Prometheus
+    server, may read them.
+    """
+    options = profiling_settings()
+    if not options['ENABLED']:
+        raise Http404('Profiling is disabled')
+    if not (
+        is_staff(request)
+        or request.META.get('REMOTE_ADDR') in options['METRICS_ALLOWED_IPS']
+    ):
+        raise PermissionDenied
+
+    return HttpResponse(
+        prometheus_text(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,23 @@
+from django.urls import URLPattern, path, include
+
+from recipe.async_views import ASYNC_ROUTES, async_view
+from recipe.urls import router
+
+app_name = 'recipe'
+
+
+def _async_pattern(pattern):
+    if pattern.name not in ASYNC_ROUTES:
+        return pattern
+
+    return URLPattern(
+        pattern.pattern,
+        async_view(pattern.callback),
+        pattern.default_args,
+        pattern.name
+    )
+
+
+urlpatterns = [
+    path('', include([_async_pattern(pattern) for pattern in router.urls])),
+]
@@ -0,0 +1,39 @@
+import functools
+
+from asgiref.sync import sync_to_async
+
+from core.db.executor import run_sync
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Router URL names served by async views under ASGI
+ASYNC_ROUTES = ('recipe-list', 'recipe-detail', 'tag-list', 'ingredient-list')
+
+
+def _render(view, request, *args, **kwargs):
+    """Call a DRF view and render its response on the same thread"""
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+
+    return response
+
+
+def async_view(view, concurrent_methods=SAFE_METHODS):
+    """Return an async version of a DRF view for ASGI servers
+
+    Requests with concurrent_methods, safe ones by default, run the view,
+    including authentication, queries and rendering, on the bounded ORM
+    executor so several are served at once. Other methods keep Django's
+    default single sync thread.
+    """
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in concurrent_methods:
+            return await run_sync(_render, view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from core.cache import TieredCache, is_process_local
+
+
+class ResponseCache:
+    """Cache of list response data per user, resource and query
+
+    Every user has a generation per resource which is part of the cache
+    keys, invalidating a resource moves to a new generation so the stale
+    entries are never read again and age out of the cache. Generations are
+    kept in the shared cache when configured, else in the local LRU with
+    the entries, evicting one only starts a new generation.
+    """
+
+    def __init__(self, maxsize=1000, ttl=300, shared_alias=None):
+        self.entries = TieredCache(
+            'response',
+            maxsize=maxsize,
+            ttl=ttl,
+            shared_alias=shared_alias
+        )
+        self.shared_alias = shared_alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _generation(self, user_id, resource):
+        """Return the current generation of a resource of a user"""
+        if self.shared_alias is None:
+            key = ('generation', user_id, resource)
+            with self._lock:
+                generation = self.entries.local.get(key)
+                if generation is None:
+                    generation = time.time_ns()
+                    self.entries.local.set(key, generation)
+            return generation
+
+        # Start from the clock so a generation dropped by the shared cache
+        # never matches the keys of older entries.
+        shared = caches[self.shared_alias]
+        key = f'response-generation:{user_id}:{resource}'
+        shared.add(key, time.time_ns(), None)
+        return shared.get(key)
+
+    def key(self, request, resource):
+        """Return the cache key of a list request"""
+        params = sorted(
+            (name, tuple(values))
+            for name, values in request.query_params.lists()
+        )
+        generation = self._generation(request.user.pk, resource)
+
+        # Rendered links are absolute, so the host is part of the key too
+        query = f'{request.scheme}://{request.get_host()}:{params}'
+
+        return (
+            f'{request.user.pk}:{resource}:{generation}:'
+            f'{hashlib.md5(query.encode()).hexdigest()}'
+        )
+
+    def get(self, key):
+        """Return the cached data for key, counting hits and misses"""
+        data = self.entries.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return data
+
+    def set(self, key, data):
+        self.entries.set(key, data)
+
+    def invalidate(self, user_id, *resources):
+        """Start new generations for resources of a user"""
+        for resource in resources:
+            if self.shared_alias is None:
+                self.entries.local.set(
+                    ('generation', user_id, resource),
+                    time.time_ns()
+                )
+            else:
+                caches[self.shared_alias].set(
+                    f'response-generation:{user_id}:{resource}',
+                    time.time_ns(),
+                    None
+                )
+
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        """Return the hit, miss and invalidation counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+    def clear(self):
+        """Drop every local entry and generation"""
+        self.entries.clear()
+
+
+def _build_response_cache():
+    """Create the list response cache from settings
+
+    Several workers need a SHARED_CACHE, invalidations of a local cache
+    only reach the worker handling the write.
+    """
+    options = getattr(settings, 'RESPONSE_CACHE', {})
+    shared_alias = options.get('SHARED_CACHE')
+    if getattr(settings, 'WEB_WORKERS', 1) > 1 and (
+        shared_alias is None or is_process_local(shared_alias)
+    ):
+        raise ImproperlyConfigured(
+            'RESPONSE_CACHE needs a SHARED_CACHE shared by the '
+            f'{settings.WEB_WORKERS} WEB_WORKERS'
+        )
+
+    return ResponseCache(
+        maxsize=options.get('MAXSIZE', 1000),
+        ttl=options.get('TTL', 300),
+        shared_alias=shared_alias,
+    )
+
+
+response_cache = _build_response_cache()
@@ -0,0 +1,133 @@
+import functools
+from collections import OrderedDict, defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+
+from rest_framework import relations, serializers
+
+
+class NotCompilable(Exception):
+    """The serializer has fields the compiled path cannot render"""
+
+
+class CompiledSerializer:
+    """Read-only version of a ModelSerializer rendering .values() rows
+
+    Supports model columns, files, read-only queryset annotations and many
+    primary key relations, which are fetched from the through tables
+    ordered by primary key. The output is identical to the serializer's
+    without creating model instances.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.model_fields = {
+            field.name for field in self.model._meta.get_fields()
+        }
+        self.columns = [self.pk]
+        self.files = {}
+        self.relations = {}
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, relations.ManyRelatedField):
+                self._compile_relation(name, field)
+            else:
+                self._compile_column(name, field)
+
+    def _model_field(self, field):
+        try:
+            return self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise NotCompilable(field.source)
+
+    def _compile_relation(self, name, field):
+        child = field.child_relation
+        model_field = self._model_field(field)
+        if (not isinstance(child, relations.PrimaryKeyRelatedField)
+                or child.pk_field is not None
+                or not isinstance(model_field, models.ManyToManyField)):
+            raise NotCompilable(name)
+
+        self.relations[name] = (
+            model_field.remote_field.through,
+            model_field.m2m_field_name() + '_id',
+            model_field.m2m_reverse_field_name() + '_id',
+        )
+
+    def _compile_column(self, name, field):
+        if isinstance(field, (relations.RelatedField,
+                              serializers.BaseSerializer,
+                              serializers.SerializerMethodField)):
+            raise NotCompilable(name)
+        if field.source == '*' or '.' in field.source:
+            raise NotCompilable(name)
+
+        if field.read_only and field.source not in self.model_fields:
+            # Annotations of the queryset, read from the row as they are
+            return
+
+        model_field = self._model_field(field)
+        if model_field.is_relation:
+            raise NotCompilable(name)
+        if isinstance(field, serializers.FileField):
+            self.files[name] = model_field
+        if field.source not in self.columns:
+            self.columns.append(field.source)
+
+    def _related_ids(self, pks):
+        """Return the related primary keys of each row per relation"""
+        related = {}
+        for name, (through, source, target) in self.relations.items():
+            links = related[name] = defaultdict(list)
+            rows = through.objects.filter(**{f'{source}__in': pks}).order_by(
+                target
+            ).values_list(source, target)
+            for pk, related_pk in rows:
+                links[pk].append(related_pk)
+
+        return related
+
+    def serialize(self, rows, context=None):
+        """Return the representation of each row"""
+        rows = list(rows)
+        fields = [
+            (name, field)
+            for name, field in self.serializer_class(
+                context=context or {}
+            ).fields.items()
+            if not field.write_only
+        ]
+        related = self._related_ids([row[self.pk] for row in rows])
+
+        data = []
+        for row in rows:
+            item = OrderedDict()
+            for name, field in fields:
+                if name in related:
+                    item[name] = related[name].get(row[self.pk], [])
+                    continue
+
+                value = row[field.source]
+                if name in self.files:
+                    model_field = self.files[name]
+                    value = model_field.attr_class(None, model_field, value)
+                item[name] = (
+                    None if value is None else field.to_representation(value)
+                )
+            data.append(item)
+
+        return data
+
+
+@functools.lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """Return the compiled serializer_class, None if not compilable"""
+    try:
+        return CompiledSerializer(serializer_class)
+    except NotCompilable:
+        return None
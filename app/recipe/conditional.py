@@ -0,0 +1,87 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Answer list and retrieve with 304 Not Modified when possible
+
+    The ETag of a list comes from the count and the latest updated_at of
+    the filtered queryset, the ETag and Last-Modified of a detail from the
+    object's updated_at. Both are read with one aggregate query before any
+    object is loaded or serialized. Lists have no Last-Modified, deleting
+    a recipe doesn't move their latest updated_at.
+    """
+
+    def _validators(self, request, count, last_modified):
+        """Return the ETag and Last-Modified timestamp of a response"""
+        key = ':'.join((
+            str(request.user.pk),
+            request.get_full_path(),
+            request.accepted_media_type or '',
+            str(count),
+            last_modified.isoformat() if last_modified else '',
+        ))
+        etag = 'W/' + quote_etag(hashlib.md5(key.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        return etag, timestamp
+
+    def _conditional_response(self, request, handler, etag, timestamp,
+                              *args, **kwargs):
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        version = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('pk'),
+            last_modified=Max('updated_at')
+        )
+        etag, _ = self._validators(
+            request,
+            version['count'],
+            version['last_modified']
+        )
+
+        return self._conditional_response(
+            request,
+            super().list,
+            etag,
+            None,
+            *args,
+            **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.filter_queryset(self.get_queryset()).filter(**{
+            self.lookup_field: kwargs[lookup_url_kwarg]
+        }).values_list('updated_at', flat=True).first()
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag, timestamp = self._validators(request, 1, last_modified)
+
+        return self._conditional_response(
+            request,
+            super().retrieve,
+            etag,
+            timestamp,
+            *args,
+            **kwargs
+        )
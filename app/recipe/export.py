@@ -0,0 +1,89 @@
+import tempfile
+
+from core.models import Recipe
+
+
+# Columns of the exported recipes, followed by the related names
+EXPORT_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link', 'image')
+EXPORT_RELATIONS = ('tags', 'ingredients')
+EXPORT_FIELDS = EXPORT_COLUMNS + EXPORT_RELATIONS
+
+# Separates the related names in CSV cells
+CSV_NAME_SEPARATOR = ';'
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _related_names(name, recipe_ids):
+    """Return the related names of each recipe, sorted by name"""
+    field = Recipe._meta.get_field(name)
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(**{
+        f'{source}_id__in': recipe_ids
+    }).order_by(f'{target}__name', f'{target}_id').values_list(
+        f'{source}_id',
+        f'{target}__name'
+    )
+
+    names = {}
+    for recipe_id, related_name in links:
+        names.setdefault(recipe_id, []).append(related_name)
+    return names
+
+
+def export_recipes(queryset, request, chunk_size=1000, flat=False):
+    """Yield the exported recipes of queryset in chunks of chunk_size
+
+    Rows are read through a server-side cursor and the related names are
+    fetched once per chunk, so memory does not grow with the library.
+    With flat the related names are joined into single CSV cells.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    rows = queryset.prefetch_related(None).values(
+        *EXPORT_COLUMNS
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _chunks(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        related = {
+            name: _related_names(name, ids) for name in EXPORT_RELATIONS
+        }
+
+        for row in chunk:
+            row['price'] = str(row['price'])
+            if row['image']:
+                row['image'] = request.build_absolute_uri(
+                    storage.url(row['image'])
+                )
+            else:
+                row['image'] = None
+            for name in EXPORT_RELATIONS:
+                names = related[name].get(row['id'], [])
+                row[name] = CSV_NAME_SEPARATOR.join(names) if flat else names
+        yield chunk
+
+
+def spool(content, max_memory=1024 * 1024):
+    """Write the bytestrings of content to a temporary file, rewound
+
+    Django's ASGI handler iterates streaming responses on the event loop,
+    reading rows there would block every other request of the worker. The
+    export is written out on the view's thread instead, in memory up to
+    max_memory bytes and on disk past that.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for part in content:
+        spooled.write(part)
+    spooled.seek(0)
+
+    return spooled
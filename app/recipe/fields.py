@@ -0,0 +1,92 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from recipe.filters import column_range, in_range
+
+
+class BatchManyRelatedField(ManyRelatedField):
+    """Many related field resolving every submitted pk in one query"""
+    default_error_messages = {
+        'does_not_exist': _('Invalid pks {pk_values} - objects do not exist.'),
+    }
+
+    prefetched = None
+
+    def parse_pks(self, data):
+        """Return the submitted pks converted to the pk field's type"""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pk_field = self.child_relation.get_queryset().model._meta.pk
+        bounds = column_range(pk_field)
+        pks = []
+        for item in data:
+            pk = None
+            if not isinstance(item, bool):
+                try:
+                    pk = pk_field.to_python(item)
+                except (DjangoValidationError, TypeError):
+                    pass
+            if pk is None or not in_range(pk, bounds):
+                self.child_relation.fail(
+                    'incorrect_type',
+                    data_type=type(item).__name__
+                )
+            pks.append(pk)
+
+        return pks
+
+    def prefetch(self, data_list):
+        """Resolve the pks of many submitted lists with one query
+
+        to_internal_value reads the objects from the result until
+        clear_prefetched is called, lists that don't validate are left out.
+        """
+        pks = set()
+        for data in data_list:
+            try:
+                pks.update(self.parse_pks(data))
+            except ValidationError:
+                pass
+
+        self.prefetched = self.child_relation.get_queryset().in_bulk(pks)
+
+    def clear_prefetched(self):
+        self.prefetched = None
+
+    def to_internal_value(self, data):
+        pks = self.parse_pks(data)
+        objects = self.prefetched
+        if objects is None:
+            objects = self.child_relation.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_values=missing)
+
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to the objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+
+        return queryset.filter(user=request.user)
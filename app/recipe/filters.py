@@ -0,0 +1,134 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.db.models import Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+def column_range(field):
+    """Return the lowest and highest values the integer column of field holds
+
+    The ranges are those of the columns every backend creates, SQLite
+    reports none but can't bind integers past 64 bits either. Other
+    columns are unbounded.
+    """
+    return BaseDatabaseOperations.integer_field_ranges.get(
+        field.get_internal_type(),
+        (None, None)
+    )
+
+
+def in_range(number, bounds):
+    low, high = bounds
+    return (low is None or number >= low) and (high is None or number <= high)
+
+
+class RecipeFilter:
+    """Filter recipes from the request query params
+
+    tags/ingredients match recipes linked to any of the given ids,
+    tags_all/ingredients_all to all of them and exclude_tags/
+    exclude_ingredients to none of them. min_time/max_time and
+    min_price/max_price limit time_minutes and price.
+
+    Relations are matched with EXISTS subqueries on the through tables, so
+    the (recipe, tag) indexes are used and no recipe is returned twice.
+    """
+    max_ids = 50
+    relations = {
+        'tags': ('tags', 'tag_id'),
+        'ingredients': ('ingredients', 'ingredient_id'),
+    }
+    ranges = {
+        'time': ('time_minutes', int),
+        'price': ('price', Decimal),
+    }
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def _parse_ids(self, param, field_name):
+        """Converts a comma separated list of IDs to a list of integers"""
+        value = self.query_params.get(param)
+        if not value:
+            return []
+
+        bounds = column_range(
+            Recipe._meta.get_field(field_name).related_model._meta.pk
+        )
+        try:
+            ids = [int(str_id) for str_id in value.split(',')]
+        except ValueError:
+            ids = None
+        if ids is None or not all(in_range(pk, bounds) for pk in ids):
+            raise ValidationError(
+                {param: [_('Expected a comma separated list of ids.')]}
+            )
+        if len(ids) > self.max_ids:
+            raise ValidationError({param: [
+                _('Ensure there are no more than {count} ids.').format(
+                    count=self.max_ids
+                )
+            ]})
+
+        return ids
+
+    def _parse_number(self, param, field_name, to_python):
+        value = self.query_params.get(param)
+        if value in (None, ''):
+            return None
+
+        try:
+            number = to_python(value)
+        except (ValueError, InvalidOperation):
+            number = None
+        if (
+            number is None
+            or not Decimal(number).is_finite()
+            or not in_range(number, column_range(
+                Recipe._meta.get_field(field_name)
+            ))
+        ):
+            raise ValidationError({param: [_('Expected a number.')]})
+
+        return number
+
+    def _related_exists(self, field_name, column, ids):
+        """Return an EXISTS matching recipes linked to any of the ids"""
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        return Exists(through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            **{f'{column}__in': ids}
+        ))
+
+    def filter_queryset(self, queryset):
+        """Return the queryset limited by the query params"""
+        for param, (field_name, column) in self.relations.items():
+            any_ids = self._parse_ids(param, field_name)
+            if any_ids:
+                queryset = queryset.filter(
+                    self._related_exists(field_name, column, any_ids)
+                )
+            for related_id in self._parse_ids(f'{param}_all', field_name):
+                queryset = queryset.filter(
+                    self._related_exists(field_name, column, [related_id])
+                )
+            exclude_ids = self._parse_ids(f'exclude_{param}', field_name)
+            if exclude_ids:
+                queryset = queryset.filter(
+                    ~self._related_exists(field_name, column, exclude_ids)
+                )
+
+        for param, (field_name, to_python) in self.ranges.items():
+            minimum = self._parse_number(f'min_{param}', field_name, to_python)
+            if minimum is not None:
+                queryset = queryset.filter(**{f'{field_name}__gte': minimum})
+            maximum = self._parse_number(f'max_{param}', field_name, to_python)
+            if maximum is not None:
+                queryset = queryset.filter(**{f'{field_name}__lte': maximum})
+
+        return queryset
@@ -0,0 +1,159 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from PIL import Image
+
+from core.models import Recipe
+
+from recipe.signals import invalidate_responses
+
+
+logger = logging.getLogger(__name__)
+
+
+def variant_name(name, variant, file_format):
+    """Return the storage name of a variant of the image name"""
+    root, _ = os.path.splitext(name)
+    return f'{root}_{variant}.{file_format.lower()}'
+
+
+def build_variants(path, name, variants):
+    """Write the resized variants of the image at path next to it
+
+    Runs in a worker process, so it only deals with files. Returns the
+    metadata of every variant keyed by its name.
+    """
+    metadata = {}
+    with Image.open(path) as original:
+        original.load()
+        for variant, options in variants.items():
+            image = original.copy()
+            image.thumbnail(options['size'], Image.LANCZOS)
+            if options['format'] == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            variant_file = variant_name(name, variant, options['format'])
+            variant_path = os.path.join(
+                os.path.dirname(path),
+                os.path.basename(variant_file)
+            )
+            image.save(
+                variant_path,
+                format=options['format'],
+                quality=options.get('quality', 85)
+            )
+            metadata[variant] = {
+                'name': variant_file,
+                'width': image.width,
+                'height': image.height,
+                'format': options['format'],
+                'size': os.path.getsize(variant_path),
+            }
+
+    return metadata
+
+
+def save_variants(recipe_id, name, metadata):
+    """Record the variants unless the recipe image changed meanwhile"""
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=metadata,
+        updated_at=timezone.now()
+    )
+    if updated:
+        user_id = Recipe.objects.filter(pk=recipe_id).values_list(
+            'user_id',
+            flat=True
+        ).first()
+        invalidate_responses(user_id, 'recipe')
+
+
+def delete_variants(metadata):
+    """Remove the files of previously built variants"""
+    for options in metadata.values():
+        default_storage.delete(options['name'])
+
+
+class SyncImageQueue:
+    """Builds the variants right away, on the calling thread"""
+
+    def __init__(self, **options):
+        pass
+
+    def submit(self, recipe_id, name):
+        metadata = build_variants(
+            default_storage.path(name),
+            name,
+            settings.RECIPE_IMAGE_VARIANTS
+        )
+        save_variants(recipe_id, name, metadata)
+
+
+class ProcessPoolImageQueue:
+    """Builds the variants in a pool of local worker processes"""
+
+    def __init__(self, max_workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, recipe_id, name):
+        future = self.executor.submit(
+            build_variants,
+            default_storage.path(name),
+            name,
+            settings.RECIPE_IMAGE_VARIANTS
+        )
+        future.add_done_callback(
+            lambda done: self._done(recipe_id, name, done)
+        )
+
+    def _done(self, recipe_id, name, future):
+        # Called on the executor's management thread, which owns its own
+        # database connection.
+        if future.exception() is not None:
+            logger.error(
+                'Building variants of %s failed',
+                name,
+                exc_info=future.exception()
+            )
+            return
+
+        try:
+            save_variants(recipe_id, name, future.result())
+        finally:
+            close_old_connections()
+
+
+_queue = None
+
+
+def get_image_queue():
+    """Return the image queue configured in RECIPE_IMAGE_QUEUE"""
+    global _queue
+    if _queue is None:
+        config = settings.RECIPE_IMAGE_QUEUE
+        _queue = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+    return _queue
+
+
+@receiver(setting_changed)
+def reset_image_queue(setting, **kwargs):
+    global _queue
+    if setting == 'RECIPE_IMAGE_QUEUE':
+        _queue = None
+
+
+def enqueue_variants(recipe):
+    """Build the variants of the recipe image once the upload is committed"""
+    recipe_id, name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: get_image_queue().submit(recipe_id, name)
+    )
@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import time
+
+from django.db import transaction
+
+from core.bulk import (
+    BATCH_SIZE, bulk_get_or_create_names, bulk_insert, bulk_link, bulk_saved
+)
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.export import CSV_NAME_SEPARATOR, EXPORT_RELATIONS
+from recipe.serializers import RecipeImportSerializer
+
+
+FORMATS = ('ndjson', 'csv')
+
+
+def read_ndjson(lines):
+    """Yield the line number and the object or error of each NDJSON line"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, ValueError(f'Invalid JSON: {exc}')
+
+
+def read_csv(lines):
+    """Yield the line number and the row of each CSV record"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        for name in EXPORT_RELATIONS:
+            value = row.get(name)
+            row[name] = [
+                item.strip() for item in (value or '').split(
+                    CSV_NAME_SEPARATOR
+                ) if item.strip()
+            ]
+        yield reader.line_num, row
+
+
+class UnreadableFile(ValueError):
+    """The file can't be decoded or parsed past a line"""
+
+
+def stop_when_unreadable(records):
+    """Yield the records until the file can't be read, then the error
+
+    The text is decoded in chunks, so the error is reported on the line
+    after the last one read and the rest of the file is skipped.
+    """
+    line = 0
+    try:
+        for line, record in records:
+            yield line, record
+    except (UnicodeDecodeError, csv.Error) as exc:
+        yield line + 1, UnreadableFile(f'Unreadable file: {exc}')
+
+
+def read_records(stream, file_format):
+    """Stream the records of a binary UTF-8 file in the given format"""
+    lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if file_format == 'csv':
+        return stop_when_unreadable(read_csv(lines))
+    return stop_when_unreadable(read_ndjson(lines))
+
+
+def format_from_name(name):
+    """Return the import format matching a file name, if any"""
+    extension = name.rsplit('.', 1)[-1].lower()
+    if extension == 'jsonl':
+        return 'ndjson'
+    return extension if extension in FORMATS else None
+
+
+class ImportReport:
+    """Counts of an import run and the errors of its rejected rows"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.errors = []
+        self.elapsed = 0.0
+        # Error stopping the import before the end of the file, if any
+        self.unreadable = None
+
+    @property
+    def throughput(self):
+        """Return the processed rows per second"""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'errors': [
+                {'line': line, 'errors': errors}
+                for line, errors in self.errors
+            ],
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput, 1),
+        }
+
+
+class RecipeImporter:
+    """Import recipes of a user in batches
+
+    Each batch is validated row by row, the tags and ingredients it names
+    are looked up or created in bulk and the valid recipes and their links
+    are inserted with bulk_create in one transaction.
+    """
+    related_models = {'tags': Tag, 'ingredients': Ingredient}
+
+    def __init__(self, user, batch_size=BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        # Primary key of every known related name, per relation
+        self.related_ids = {name: {} for name in self.related_models}
+
+    def run(self, records):
+        """Import (line number, record) pairs and return the report"""
+        report = ImportReport()
+        start = time.perf_counter()
+
+        batch = []
+        for line, record in records:
+            batch.append((line, record))
+            if len(batch) == self.batch_size:
+                self.import_batch(batch, report)
+                batch = []
+        if batch:
+            self.import_batch(batch, report)
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def validate(self, batch, report):
+        """Return the validated data of the valid rows of a batch"""
+        valid = []
+        for line, record in batch:
+            report.processed += 1
+            if isinstance(record, UnreadableFile):
+                report.unreadable = f'Line {line}: {record}'
+            if isinstance(record, Exception):
+                report.errors.append((line, {'non_field_errors': [
+                    str(record)
+                ]}))
+                continue
+            if not isinstance(record, dict):
+                report.errors.append((line, {'non_field_errors': [
+                    'Expected an object.'
+                ]}))
+                continue
+
+            serializer = RecipeImportSerializer(data=record)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                report.errors.append((line, serializer.errors))
+
+        return valid
+
+    def upsert_names(self, relation, names):
+        """Make sure every name exists for the user, return their ids"""
+        model = self.related_models[relation]
+        known = self.related_ids[relation]
+        missing = set(names) - set(known)
+        if missing:
+            for name, obj in bulk_get_or_create_names(
+                model,
+                self.user,
+                missing,
+                batch_size=self.batch_size
+            ).items():
+                known[name] = obj.pk
+
+        return known
+
+    def import_batch(self, batch, report):
+        """Insert the valid recipes of a batch with their links"""
+        valid = self.validate(batch, report)
+        if not valid:
+            return
+
+        with transaction.atomic():
+            related = {}
+            for relation in self.related_models:
+                names = {
+                    name for data in valid for name in data.get(relation, [])
+                }
+                related[relation] = self.upsert_names(relation, names)
+
+            recipes = bulk_insert(Recipe, [
+                Recipe(user=self.user, **{
+                    key: value for key, value in data.items()
+                    if key not in self.related_models
+                })
+                for data in valid
+            ], batch_size=self.batch_size)
+
+            for relation, model in self.related_models.items():
+                ids = related[relation]
+                bulk_link(Recipe._meta.get_field(relation), [
+                    (recipe, [model(pk=ids[name])
+                              for name in data.get(relation, [])])
+                    for recipe, data in zip(recipes, valid)
+                ], batch_size=self.batch_size)
+
+            bulk_saved.send(sender=Recipe, instances=recipes)
+
+        report.created += len(recipes)
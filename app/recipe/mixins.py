@@ -0,0 +1,186 @@
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.db.router import current_replica
+from core.profiling import profile_section
+
+from recipe.cache import response_cache
+from recipe.compiled import compile_serializer
+from recipe.filters import column_range, in_range
+
+
+class BulkModelMixin:
+    """Create or update many objects in a single request
+
+    The whole batch is validated first and written in one transaction, any
+    invalid item rejects the batch with an error entry for every item.
+    """
+    bulk_max_items = 5000
+
+    def _bulk_error(self, message):
+        return Response(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(methods=['POST', 'PATCH'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create or partially update a list of objects"""
+        if not isinstance(request.data, list):
+            return self._bulk_error(_('Expected a list of items.'))
+        if len(request.data) > self.bulk_max_items:
+            return self._bulk_error(
+                _('Ensure there are no more than {count} items.').format(
+                    count=self.bulk_max_items
+                )
+            )
+
+        with transaction.atomic():
+            if request.method == 'POST':
+                return self._bulk_create(request.data)
+            return self._bulk_update(request.data)
+
+    def _bulk_create(self, data):
+        serializer = self.get_serializer(data=data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _parse_id(self, item):
+        """Return the primary key of an update item, None when invalid"""
+        pk_field = self.get_queryset().model._meta.pk
+        value = item.get('id') if isinstance(item, dict) else None
+        if isinstance(value, bool):
+            return None
+        try:
+            pk = pk_field.to_python(value)
+        except ValidationError:
+            return None
+        if pk is None or not in_range(pk, column_range(pk_field)):
+            return None
+
+        return pk
+
+    def _bulk_update(self, data):
+        ids = [self._parse_id(item) for item in data]
+        instances = self.get_queryset().filter(
+            id__in=[pk for pk in ids if pk is not None]
+        ).in_bulk()
+
+        counts = Counter(ids)
+        errors = []
+        for pk in ids:
+            if pk is None:
+                errors.append({'id': [_('Expected an object id.')]})
+            elif pk not in instances:
+                errors.append({'id': [_('Object not found.')]})
+            elif counts[pk] > 1:
+                errors.append({'id': [_('Duplicated object.')]})
+            else:
+                errors.append({})
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(
+            [instances[pk] for pk in ids],
+            data=data,
+            many=True,
+            partial=True
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                self.perform_bulk_update(serializer)
+        except IntegrityError:
+            # Renamed onto a name the user already has
+            return self._bulk_error(
+                _('A conflicting object already exists.')
+            )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def perform_bulk_update(self, serializer):
+        """Updating existing objects"""
+        serializer.save()
+
+
+def _plain(data):
+    """Copy response data into plain containers, dropping serializers"""
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    return data
+
+
+class CachedListMixin:
+    """Serve repeated list requests from the per-user response cache
+
+    Entries are keyed on the user, the resource and the normalized query
+    parameters, recipe.signals invalidates them on every write. Lists read
+    from a replica are not cached. The X-Cache header tells whether the
+    response was a hit.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache.key(request, self.queryset.model._meta.model_name)
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        # Replicas may lag behind the generation, their rows are not cached
+        if response.status_code == 200 and current_replica() is None:
+            response_cache.set(key, _plain(response.data))
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+
+class CompiledListMixin:
+    """Render list pages from .values() rows with a compiled serializer
+
+    Lists whose serializer cannot be compiled use the regular path.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.prefetch_related(None).values(
+            *compiled.columns,
+            *queryset.query.annotations
+        )
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(rows)
+        with profile_section('serialize'):
+            data = compiled.serialize(
+                rows if page is None else page,
+                context
+            )
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """Keyset pagination with an opt-in, capped page size"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """Paginates recipes on their primary key
+
+    Searches annotated with a rank are paginated by relevance instead.
+    """
+    ordering = ('id',)
+    search_ordering = ('-rank', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttributeCursorPagination(BaseCursorPagination):
+    """Paginates tags and ingredients on their name, unique per user"""
+    ordering = ('-name',)
@@ -0,0 +1,57 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, FloatField, OuterRef, Q
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient
+from core.search import search_enabled
+
+
+MAX_TERMS = 10
+
+
+def search_terms(value):
+    """Split a search string into its words"""
+    return re.findall(r'[^\W_]+', value)[:MAX_TERMS]
+
+
+def search_recipes(queryset, value):
+    """Limit recipes to those matching every word of the search
+
+    Each word matches as a prefix of the words in the title, tag names and
+    ingredient names. On PostgreSQL the stored search vectors are used and
+    the recipes are annotated with their relevance as rank, elsewhere the
+    words are looked up with case insensitive LIKE queries.
+    """
+    terms = search_terms(value)
+    if not terms:
+        return queryset
+
+    if search_enabled():
+        query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=settings.RECIPE_SEARCH_CONFIG
+        )
+        # Cast the rank to double precision so it survives a round trip
+        # through the pagination cursor exactly.
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    for term in terms:
+        queryset = queryset.filter(
+            Exists(Tag.objects.filter(
+                recipe=OuterRef('pk'),
+                name__icontains=term
+            )) |
+            Exists(Ingredient.objects.filter(
+                recipe=OuterRef('pk'),
+                name__icontains=term
+            )) |
+            Q(title__icontains=term)
+        )
+
+    return queryset
@@ -1,40 +1,219 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+from django.db.models import prefetch_related_objects
+
 from rest_framework import serializers
 
+from core.bulk import (
+    BATCH_SIZE, bulk_get_or_create_names, bulk_insert, bulk_link, bulk_saved
+)
 from core.models import Tag
 from core.models import Ingredient
 from core.models import Recipe
+from core.profiling import ProfiledSerializerMixin
+
+from recipe.fields import BatchManyRelatedField, UserPrimaryKeyRelatedField
+
+
+class BulkListSerializer(ProfiledSerializerMixin, serializers.ListSerializer):
+    """Serializer writing many objects with a few bulk queries"""
+
+    def _m2m_fields(self):
+        return [
+            field.name for field in self.child.Meta.model._meta.many_to_many
+            if field.name in self.child.fields
+        ]
+
+    def to_internal_value(self, data):
+        """Validate every item, resolving related ids once for the batch"""
+        fields = [
+            field for field in self.child.fields.values()
+            if isinstance(field, BatchManyRelatedField) and not field.read_only
+        ]
+        if isinstance(data, list):
+            for field in fields:
+                field.prefetch([
+                    item[field.field_name] for item in data
+                    if isinstance(item, dict) and field.field_name in item
+                ])
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.clear_prefetched()
+
+    def _save_related(self, instances, related, clear=False):
+        """Link the saved objects and prefetch the links for rendering"""
+        model = self.child.Meta.model
+        for name, related_objects in related.items():
+            bulk_link(model._meta.get_field(name), related_objects, clear)
+
+        bulk_saved.send(sender=model, instances=instances)
+
+        for instance in instances:
+            instance._prefetched_objects_cache = {}
+        prefetch_related_objects(instances, *self._m2m_fields())
+
+    def create(self, validated_data):
+        """Create every object and its relations in bulk"""
+        model = self.child.Meta.model
+        m2m_fields = self._m2m_fields()
+        related = {name: [] for name in m2m_fields}
+
+        instances = []
+        for attrs in validated_data:
+            m2m = {name: attrs.pop(name, []) for name in m2m_fields}
+            instance = model(**attrs)
+            instances.append(instance)
+            for name, objs in m2m.items():
+                related[name].append((instance, objs))
+
+        bulk_insert(model, instances)
+        self._save_related(instances, related)
+
+        return instances
+
+    def update(self, instances, validated_data):
+        """Update every object and replace the given relations in bulk"""
+        model = self.child.Meta.model
+        m2m_fields = self._m2m_fields()
+        related = {}
+        fields = set()
+
+        for instance, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                if name in m2m_fields:
+                    related.setdefault(name, []).append((instance, value))
+                else:
+                    setattr(instance, name, value)
+                    fields.add(name)
+
+        # bulk_update skips pre_save, stamp auto_now fields by hand
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+                fields.add(field.name)
+
+        if fields:
+            model.objects.bulk_update(
+                instances,
+                fields,
+                batch_size=BATCH_SIZE
+            )
+        self._save_related(instances, related, clear=True)
+
+        return instances
+
+
+class AttributeListSerializer(BulkListSerializer):
+    """Bulk serializer reusing the attributes whose name already exists"""
+
+    def create(self, validated_data):
+        """Get or create every named object with a few bulk queries"""
+        model = self.child.Meta.model
+        instances = []
+        for user, items in groupby(validated_data, key=itemgetter('user')):
+            items = list(items)
+            objs = bulk_get_or_create_names(
+                model,
+                user,
+                [attrs['name'] for attrs in items]
+            )
+            instances.extend(objs[attrs['name']] for attrs in items)
+
+        bulk_saved.send(sender=model, instances=instances)
+
+        return instances
+
+
+class AttributeSerializer(ProfiledSerializerMixin,
+                          serializers.ModelSerializer):
+    """Serializer for tags and ingredients, unique by name for a user
+
+    Creating an existing name returns the existing object, created tells
+    whether the object was inserted.
+    """
+    created = False
+
+    def create(self, validated_data):
+        instance, self.created = self.Meta.model.objects.get_or_create(
+            **validated_data
+        )
+        return instance
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(AttributeSerializer):
     """Serializer for tag object"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name',)
         read_only_Fields = ('id',)
+        list_serializer_class = AttributeListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(AttributeSerializer):
     """Serializer for ingredient object"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name',)
         read_only_Fields = ('id',)
+        list_serializer_class = AttributeListSerializer
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tag object with the number of recipes using it"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredient object with the number of recipes using it"""
+    recipe_count = serializers.IntegerField(read_only=True)
 
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class ImageVariantsField(serializers.Field):
+    """Renders the URL of every built variant of a recipe image"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, options in value.items():
+            url = default_storage.url(options['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant] = url
+
+        return urls
+
+
+class RecipeSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for recipe object"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
             many=True,
             queryset=Ingredient.objects.all()
         )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
             many=True,
             queryset=Tag.objects.all()
         )
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = (
@@ -45,9 +224,11 @@ class RecipeSerializer(serializers.ModelSerializer):
             'time_minutes',
             'price',
             'link',
-            'image'
+            'image',
+            'image_variants'
         )
         read_only_Fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -56,10 +237,35 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(ProfiledSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializer for uploading images for recipes"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image',)
+        fields = ('id', 'image', 'image_variants',)
         read_only_Fields = ('id',)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serializer validating an imported recipe, relations given by name"""
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'title',
+            'ingredients',
+            'tags',
+            'time_minutes',
+            'price',
+            'link',
+        )
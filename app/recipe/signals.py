@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.bulk import bulk_saved
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.cache import response_cache
+
+
+RESOURCES = ('recipe', 'tag', 'ingredient')
+
+
+def invalidate_responses(user_id, *resources):
+    """Drop the cached list responses of a user
+
+    The generations move again once the transaction commits, discarding
+    responses that concurrent requests cached from the old rows meanwhile.
+    """
+    response_cache.invalidate(user_id, *resources)
+    transaction.on_commit(
+        lambda: response_cache.invalidate(user_id, *resources)
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_user_responses(sender, instance, created, **kwargs):
+    """Start new users without any cached response"""
+    if created:
+        invalidate_responses(instance.pk, *RESOURCES)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def invalidate_saved(sender, instance, created, **kwargs):
+    """Drop the lists of a created or updated object
+
+    Recipes are searched by the names of their tags and ingredients, so
+    updating one drops the recipe lists too.
+    """
+    resources = (sender._meta.model_name,)
+    if sender is not Recipe and not created:
+        resources += ('recipe',)
+    invalidate_responses(instance.user_id, *resources)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_deleted(sender, instance, **kwargs):
+    """Drop the lists a deleted object or its links appeared in"""
+    invalidate_responses(instance.user_id, *RESOURCES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_linked(sender, instance, action, **kwargs):
+    """Drop the lists of both sides of changed recipe links"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_responses(instance.user_id, *RESOURCES)
+
+
+@receiver(bulk_saved)
+def invalidate_bulk_saved(sender, instances, **kwargs):
+    """Drop the lists of objects written in bulk, links included"""
+    resources = RESOURCES if sender is Recipe else (
+        sender._meta.model_name,
+        'recipe',
+    )
+    for user_id in {instance.user_id for instance in instances}:
+        invalidate_responses(user_id, *resources)
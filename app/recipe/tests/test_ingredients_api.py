@@ -58,7 +58,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
-        self.assertEqual(resource.data, serializer.data)
+        self.assertEqual(resource.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that ingredients are limited to the user"""
@@ -72,8 +72,8 @@ class PrivateIngredientsApiTests(TestCase):
         resource = self.client.get(INGREDIENTS_URL)
         serializer = IngredientSerializer(ingredient)
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resource.data), 1)
-        self.assertEqual(resource.data[0], serializer.data)
+        self.assertEqual(len(resource.data['results']), 1)
+        self.assertEqual(resource.data['results'][0], serializer.data)
 
     def test_create_ingredient_successfully(self):
         """Test creates new ingredient successfully"""
@@ -111,8 +111,8 @@ class PrivateIngredientsApiTests(TestCase):
 
             serializer1 = IngredientSerializer(ingredient1)
             serializer2 = IngredientSerializer(ingredient2)
-            self.assertIn(serializer1.data, resource.data)
-            self.assertNotIn(serializer2.data, resource.data)
+            self.assertIn(serializer1.data, resource.data['results'])
+            self.assertNotIn(serializer2.data, resource.data['results'])
 
     def test_retrieve_ingredient_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -131,4 +131,17 @@ class PrivateIngredientsApiTests(TestCase):
 
         resource = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(resource.data), 1)
+        self.assertEqual(len(resource.data['results']), 1)
+
+    def test_create_existing_ingredient_returns_it(self):
+        """Test creating an ingredient twice returns the existing one"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        resource = self.client.post(INGREDIENTS_URL, {'name': 'Salt'})
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(resource.data['id'], ingredient.id)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            1
+        )
@@ -1,23 +1,51 @@
+import csv
+import fcntl
+import io
+import json
 import tempfile
 import os
+import time
+from unittest import skipUnless
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from django.urls import reverse
-from django.test import TestCase
+from django.utils.http import http_date
+from django.db import connection
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings
+)
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import Recipe
 from core.models import Tag
 from core.models import Ingredient
 
+from core.renderers import FastJSONRenderer
+
+from recipe.cache import (
+    ResponseCache, _build_response_cache, response_cache
+)
+from recipe.compiled import compile_serializer
+from recipe.export import spool
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.serializers import TagSerializer, IngredientSerializer
+from recipe.views import RecipeViewSet
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
 
 
 def image_upload_url(recipe_id):
@@ -85,7 +113,7 @@ class PriceRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
-        self.assertEqual(resource.data, serializer.data)
+        self.assertEqual(resource.data['results'], serializer.data)
 
     def test_retrieve_recipes_limited_to_user(self):
         """Test retrieving recipes limited to user"""
@@ -101,8 +129,8 @@ class PriceRecipeApiTests(TestCase):
 
         recipes = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(len(resource.data), 1)
-        self.assertEqual(resource.data, serializer.data)
+        self.assertEqual(len(resource.data['results']), 1)
+        self.assertEqual(resource.data['results'], serializer.data)
 
     def test_retrieve_recipe_detail(self):
         """Test retrieving recipe detail"""
@@ -244,6 +272,243 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_non_image_file_rejected(self):
+        """Test uploading a file without an image signature"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as tempFile:
+            tempFile.write(b'not an image at all')
+            tempFile.seek(0)
+            res = self.client.post(
+                url,
+                {'image': tempFile}, format='multipart'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSIONS=(5, 5))
+    def test_upload_image_too_many_pixels_rejected(self):
+        """Test images over the maximum dimensions are rejected"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as tempImage:
+            Image.new('RGB', (10, 10)).save(tempImage, format='PNG')
+            tempImage.seek(0)
+            res = self.client.post(
+                url,
+                {'image': tempImage}, format='multipart'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('5x5', res.data['detail'])
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=1000)
+    def test_upload_image_too_large_rejected(self):
+        """Test files over the size limit are rejected"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as tempImage:
+            Image.effect_noise((300, 300), 100).save(tempImage, format='PNG')
+            tempImage.seek(0)
+            res = self.client.post(
+                url,
+                {'image': tempImage}, format='multipart'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+
+class RecipeChunkedImageUploadTests(TestCase):
+    """Tests uploading recipe images in resumable chunks"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.chunk_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            RECIPE_IMAGE_CHUNK_DIR=self.chunk_dir.name
+        )
+        self.settings_override.enable()
+        self.url = image_upload_url(self.recipe.id) + 'chunks/'
+
+        image = Image.new('RGB', (10, 10))
+        with tempfile.TemporaryFile() as tempImage:
+            image.save(tempImage, format='JPEG')
+            tempImage.seek(0)
+            self.image = tempImage.read()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.chunk_dir.cleanup()
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def put_chunk(self, start, end, total=None, data=None):
+        """Sends the bytes start to end of the image"""
+        total = total or len(self.image)
+        return self.client.put(
+            self.url,
+            data=self.image[start:end + 1] if data is None else data,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total}'
+        )
+
+    def test_upload_image_in_chunks(self):
+        """Test uploading an image in two chunks"""
+        middle = len(self.image) // 2
+
+        res = self.put_chunk(0, middle - 1)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['offset'], middle)
+        self.assertEqual(self.client.get(self.url).data['offset'], middle)
+
+        res = self.put_chunk(middle, len(self.image) - 1)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        with open(self.recipe.image.path, 'rb') as uploaded:
+            self.assertEqual(uploaded.read(), self.image)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    def test_upload_chunk_out_of_order(self):
+        """Test a chunk not starting at the offset is refused"""
+        res = self.put_chunk(10, 19)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 0)
+
+    def test_upload_chunk_not_an_image(self):
+        """Test the first chunk is checked for an image signature"""
+        res = self.put_chunk(0, 99, total=1000, data=b'x' * 100)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=1000)
+    def test_upload_chunk_total_too_large(self):
+        """Test uploads announcing a size over the limit are refused"""
+        res = self.put_chunk(0, 99, total=5000)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_chunk_invalid_range(self):
+        """Test a missing Content-Range header is refused"""
+        res = self.client.put(
+            self.url,
+            data=self.image,
+            content_type='application/octet-stream'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_upload_chunk_empty_body(self):
+        """Test a chunk without a body is refused as too short"""
+        res = self.put_chunk(0, 99, data=b'')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    def test_upload_chunk_while_another_is_written(self):
+        """Test a chunk sent while one is being appended is refused"""
+        middle = len(self.image) // 2
+        self.put_chunk(0, middle - 1)
+
+        path = os.path.join(
+            self.chunk_dir.name,
+            f'recipe-{self.recipe.pk}.part'
+        )
+        with open(path, 'ab') as partial:
+            fcntl.flock(partial, fcntl.LOCK_EX)
+            res = self.put_chunk(middle, len(self.image) - 1)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], middle)
+        self.assertEqual(self.client.get(self.url).data['offset'], middle)
+
+
+@override_settings(RECIPE_IMAGE_QUEUE={
+    'BACKEND': 'recipe.images.SyncImageQueue',
+})
+class RecipeImageVariantsTests(TransactionTestCase):
+    """Tests building resized variants of uploaded recipe images"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        for options in self.recipe.image_variants.values():
+            default_storage.delete(options['name'])
+        self.recipe.image.delete()
+
+    def upload_image(self, size=(800, 400)):
+        """Uploads a generated JPEG image to the recipe"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as tempImage:
+            image = Image.new('RGB', size)
+            image.save(tempImage, format='JPEG')
+            tempImage.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': tempImage}, format='multipart'
+            )
+
+    def test_upload_image_builds_variants(self):
+        """Test resized variants are recorded once the upload is saved"""
+        self.upload_image()
+
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), {'thumbnail', 'medium', 'webp'})
+        self.assertEqual(
+            (variants['thumbnail']['width'], variants['thumbnail']['height']),
+            (150, 75)
+        )
+        self.assertEqual(variants['webp']['format'], 'WEBP')
+        for options in variants.values():
+            self.assertTrue(default_storage.exists(options['name']))
+
+    def test_variant_urls_in_recipe_detail(self):
+        """Test the recipe detail links to the image variants"""
+        self.upload_image()
+
+        resource = self.client.get(detail_url(self.recipe.id))
+
+        self.recipe.refresh_from_db()
+        variants = resource.data['image_variants']
+        self.assertEqual(set(variants), {'thumbnail', 'medium', 'webp'})
+        self.assertTrue(variants['thumbnail'].startswith('http://'))
+        self.assertTrue(variants['thumbnail'].endswith(
+            self.recipe.image_variants['thumbnail']['name']
+        ))
+
+    def test_new_upload_replaces_variants(self):
+        """Test uploading a new image removes the previous variants"""
+        self.upload_image()
+        self.recipe.refresh_from_db()
+        old_image = self.recipe.image.name
+        old_variants = self.recipe.image_variants
+
+        self.upload_image(size=(300, 300))
+
+        default_storage.delete(old_image)
+        for options in old_variants.values():
+            self.assertFalse(default_storage.exists(options['name']))
+
 
 class RecipeFilterTests(TestCase):
 
@@ -273,9 +538,9 @@ class RecipeFilterTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, result.data)
-        self.assertIn(serializer2.data, result.data)
-        self.assertNotIn(serializer3.data, result.data)
+        self.assertIn(serializer1.data, result.data['results'])
+        self.assertIn(serializer2.data, result.data['results'])
+        self.assertNotIn(serializer3.data, result.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -295,6 +560,1053 @@ class RecipeFilterTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, result.data)
-        self.assertIn(serializer2.data, result.data)
-        self.assertNotIn(serializer3.data, result.data)
+        self.assertIn(serializer1.data, result.data['results'])
+        self.assertIn(serializer2.data, result.data['results'])
+        self.assertNotIn(serializer3.data, result.data['results'])
+
+    def test_filter_recipes_matching_many_ids_once(self):
+        """Test a recipe matching several filter ids is returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Vegetarian')
+        recipe.tags.add(tag1, tag2)
+
+        result = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(result.data['results']), 1)
+
+    def test_filter_recipes_with_all_tags(self):
+        """Test returning recipes linked to every given tag"""
+        recipe1 = sample_recipe(user=self.user, title='Vegan curry')
+        recipe2 = sample_recipe(user=self.user, title='Curry')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag2)
+
+        result = self.client.get(
+            RECIPE_URL,
+            {'tags_all': f'{tag1.id},{tag2.id}'}
+        )
+
+        ids = [recipe['id'] for recipe in result.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_excluding_ingredients(self):
+        """Test excluding recipes containing given ingredients"""
+        recipe1 = sample_recipe(user=self.user, title='Fruit salad')
+        recipe2 = sample_recipe(user=self.user, title='Peanut cookies')
+        ingredient = sample_ingredient(user=self.user, name='Peanuts')
+        recipe2.ingredients.add(ingredient)
+
+        result = self.client.get(
+            RECIPE_URL,
+            {'exclude_ingredients': f'{ingredient.id}'}
+        )
+
+        ids = [recipe['id'] for recipe in result.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_by_time_and_price(self):
+        """Test returning recipes within time and price ranges"""
+        recipe = sample_recipe(user=self.user, time_minutes=20, price=8.50)
+        sample_recipe(user=self.user, time_minutes=5, price=8.50)
+        sample_recipe(user=self.user, time_minutes=20, price=30.00)
+
+        result = self.client.get(RECIPE_URL, {
+            'min_time': 10,
+            'max_time': 30,
+            'max_price': '10.00',
+        })
+
+        ids = [recipe['id'] for recipe in result.data['results']]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter params return a bad request"""
+        for params in ({'tags': 'abc'}, {'min_price': 'cheap'},
+                       {'max_time': 'nan'}, {'max_time': '9' * 23},
+                       {'min_time': str(-2 ** 31 - 1)},
+                       {'ingredients': f'1,{2 ** 63}'},
+                       {'exclude_tags': str(2 ** 31)}):
+            result = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], result.data)
+
+
+class RecipeQueryCountTests(TestCase):
+    """Tests the recipe endpoints run a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count, related_count=3):
+        """Creates recipes each linked to some tags and ingredients"""
+        recipes = []
+        start = Recipe.objects.filter(user=self.user).count()
+        for i in range(start, start + count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            for j in range(related_count):
+                name = f'{i}.{j}'
+                recipe.tags.add(sample_tag(user=self.user, name=f'Tag {name}'))
+                recipe.ingredients.add(
+                    sample_ingredient(self.user, name=f'Ingredient {name}')
+                )
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_recipes_query_count(self):
+        """Test listing recipes does not run a query per recipe"""
+        self.create_recipes(1)
+        with self.assertNumQueries(4):
+            self.client.get(RECIPE_URL)
+
+        self.create_recipes(20, related_count=5)
+        with self.assertNumQueries(4):
+            resource = self.client.get(RECIPE_URL)
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resource.data['results']), 21)
+
+    def test_list_recipes_prefetch_matches_serializer(self):
+        """Test the prefetched list renders the same related ids"""
+        self.create_recipes(3)
+
+        resource = self.client.get(RECIPE_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(resource.data['results'], serializer.data)
+
+    def test_retrieve_recipe_query_count(self):
+        """Test recipe detail does not run a query per related object"""
+        recipe = self.create_recipes(1, related_count=10)[0]
+
+        with self.assertNumQueries(4):
+            resource = self.client.get(detail_url(recipe.id))
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resource.data['tags']), 10)
+        self.assertEqual(
+            sorted(resource.data['tags'], key=lambda tag: tag['id']),
+            sorted(serializer.data['tags'], key=lambda tag: tag['id'])
+        )
+
+
+class RecipePaginationTests(TestCase):
+    """Tests the recipe list is paginated with cursors"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_paginate_recipes_with_cursor(self):
+        """Test following the next cursor walks every recipe once"""
+        recipes = [
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        resource = self.client.get(RECIPE_URL, {'page_size': 2})
+        ids = [recipe['id'] for recipe in resource.data['results']]
+        while resource.data['next']:
+            resource = self.client.get(resource.data['next'])
+            ids += [recipe['id'] for recipe in resource.data['results']]
+
+        self.assertEqual(ids, [recipe.id for recipe in recipes])
+
+    def test_page_size_limited_to_maximum(self):
+        """Test requesting a huge page returns at most the maximum size"""
+        paginator = RecipeViewSet.pagination_class
+        for i in range(paginator.max_page_size + 1):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        resource = self.client.get(RECIPE_URL, {'page_size': 100000})
+
+        self.assertEqual(
+            len(resource.data['results']),
+            paginator.max_page_size
+        )
+        self.assertIsNotNone(resource.data['next'])
+
+
+class RecipeBulkApiTests(TestCase):
+    """Tests creating and updating recipes in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with their tags and ingredients"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(3)
+        ]
+
+        resource = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(resource.data), 3)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            [item['title'] for item in payload]
+        )
+        for recipe, item in zip(recipes, resource.data):
+            self.assertEqual(item['id'], recipe.id)
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_resolves_related_ids_once(self):
+        """Test the ids of every item are looked up in one query per field"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tags[i % 5].id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(20)
+        ]
+        serializer = RecipeSerializer(data=payload, many=True)
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(
+            [item['tags'] for item in serializer.validated_data],
+            [[tags[i % 5]] for i in range(20)]
+        )
+        payload[3]['tags'] = [9999]
+        serializer = RecipeSerializer(data=payload, many=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('tags', serializer.errors[3])
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test an invalid item rejects the whole batch"""
+        payload = [
+            {
+                'title': 'Valid',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [],
+                'ingredients': [],
+            },
+            {'title': 'Invalid', 'price': '5.00'},
+        ]
+
+        resource = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resource.data[0], {})
+        self.assertIn('time_minutes', resource.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test the bulk endpoint rejects a single object"""
+        payload = {'title': 'Single', 'time_minutes': 10, 'price': '5.00'}
+
+        resource = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test updating many recipes and replacing their tags"""
+        recipe1 = sample_recipe(user=self.user, title='Recipe 1')
+        recipe2 = sample_recipe(user=self.user, title='Recipe 2')
+        recipe1.tags.add(sample_tag(user=self.user))
+        new_tag = sample_tag(user=self.user, name='Curry')
+        payload = [
+            {'id': recipe1.id, 'title': 'Updated 1', 'tags': [new_tag.id]},
+            {'id': recipe2.id, 'time_minutes': 99},
+        ]
+
+        resource = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Updated 1')
+        self.assertEqual(list(recipe1.tags.all()), [new_tag])
+        self.assertEqual(recipe2.title, 'Recipe 2')
+        self.assertEqual(recipe2.time_minutes, 99)
+        self.assertEqual(resource.data[0]['tags'], [new_tag.id])
+
+    def test_bulk_update_other_user_recipe(self):
+        """Test recipes of other users can't be updated in bulk"""
+        other_user = get_user_model().objects.create_user(
+            'other_test@server.com',
+            'pass123'
+        )
+        recipe = sample_recipe(user=other_user)
+        payload = [{'id': recipe.id, 'title': 'Stolen'}]
+
+        resource = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', resource.data[0])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    def test_bulk_update_invalid_ids(self):
+        """Test ids that aren't integers are rejected per item"""
+        recipe = sample_recipe(user=self.user)
+        payload = [
+            {'id': [recipe.id], 'title': 'List'},
+            {'id': {'pk': recipe.id}, 'title': 'Object'},
+            {'id': 2 ** 63, 'title': 'Overflow'},
+            {'title': 'Missing'},
+        ]
+
+        resource = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(resource.data), 4)
+        for errors in resource.data:
+            self.assertIn('id', errors)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+
+class RecipeRelatedValidationTests(TestCase):
+    """Tests validating the tags and ingredients submitted for a recipe"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def payload(self, **params):
+        """Returns a recipe payload"""
+        defaults = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '10.00',
+            'tags': [],
+            'ingredients': [],
+        }
+        defaults.update(params)
+        return defaults
+
+    def test_related_ids_resolved_in_one_query(self):
+        """Test submitted tag ids are validated with a single query"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        payload = self.payload(tags=[tag.id for tag in tags[:1]])
+        serializer = RecipeSerializer(data=payload)
+        with self.assertNumQueries(1):
+            serializer.is_valid()
+
+        payload = self.payload(tags=[tag.id for tag in tags])
+        serializer = RecipeSerializer(data=payload)
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(serializer.validated_data['tags'], tags)
+
+    def test_missing_related_ids_reported_together(self):
+        """Test every unknown id is reported in one error"""
+        tag = sample_tag(user=self.user)
+        payload = self.payload(tags=[tag.id, 9998, 9999])
+
+        resource = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(resource.data['tags']), 1)
+        self.assertIn('9998', resource.data['tags'][0])
+        self.assertIn('9999', resource.data['tags'][0])
+
+    def test_related_ids_limited_to_user(self):
+        """Test tags of another user can't be linked to a recipe"""
+        other_user = get_user_model().objects.create_user(
+            'other_test@server.com',
+            'pass123'
+        )
+        tag = sample_tag(user=other_user)
+        payload = self.payload(tags=[tag.id])
+
+        resource = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_related_id_type(self):
+        """Test a non numeric id is rejected"""
+        payload = self.payload(ingredients=['abc'])
+
+        resource = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ingredients', resource.data)
+
+    def test_related_id_out_of_range(self):
+        """Test ids the id column can't hold are rejected"""
+        for value in (10 ** 30, -2 ** 63 - 1, None):
+            payload = self.payload(tags=[value])
+
+            resource = self.client.post(RECIPE_URL, payload, format='json')
+
+            self.assertEqual(
+                resource.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+            self.assertIn('Incorrect type', resource.data['tags'][0])
+
+
+class RecipeSearchTests(TestCase):
+    """Tests searching recipes by title, tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, value):
+        """Returns the ids of the recipes found for value"""
+        result = self.client.get(RECIPE_URL, {'search': value})
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in result.data['results']]
+
+    def test_search_recipes_by_title_prefix(self):
+        """Test searching recipes by the start of a title word"""
+        recipe = sample_recipe(user=self.user, title='Thai green curry')
+        sample_recipe(user=self.user, title='Fish and chips')
+
+        self.assertEqual(self.search('cur'), [recipe.id])
+
+    def test_search_recipes_by_related_names(self):
+        """Test searching recipes by tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title='Pancakes')
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        recipe1.tags.add(sample_tag(user=self.user, name='Breakfast'))
+        recipe2.ingredients.add(sample_ingredient(user=self.user, name='Eggs'))
+
+        self.assertEqual(self.search('breakfast'), [recipe1.id])
+        self.assertEqual(self.search('egg'), [recipe2.id])
+
+    def test_search_recipes_matches_every_word(self):
+        """Test every searched word has to match"""
+        recipe = sample_recipe(user=self.user, title='Vegan curry')
+        recipe.tags.add(sample_tag(user=self.user, name='Spicy'))
+        sample_recipe(user=self.user, title='Beef curry')
+
+        self.assertEqual(self.search('curry spicy'), [recipe.id])
+
+    def test_search_recipes_limited_to_user(self):
+        """Test searching only returns recipes of the user"""
+        other_user = get_user_model().objects.create_user(
+            'other_test@server.com',
+            'pass123'
+        )
+        sample_recipe(user=other_user, title='Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_follows_renamed_tags(self):
+        """Test a renamed tag is found by its new name"""
+        recipe = sample_recipe(user=self.user, title='Pancakes')
+        tag = sample_tag(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+        tag.name = 'Brunch'
+        tag.save()
+
+        self.assertEqual(self.search('brunch'), [recipe.id])
+        self.assertEqual(self.search('breakfast'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+    def test_search_ranks_title_matches_first(self):
+        """Test recipes matching in the title rank above tag matches"""
+        recipe1 = sample_recipe(user=self.user, title='Pancakes')
+        recipe1.tags.add(sample_tag(user=self.user, name='Curry'))
+        recipe2 = sample_recipe(user=self.user, title='Curry')
+
+        self.assertEqual(self.search('curry'), [recipe2.id, recipe1.id])
+
+
+class RecipeConditionalGetTests(TestCase):
+    """Tests answering unchanged recipe requests with 304"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def assertNotModified(self, url, etag):
+        """Asserts url is answered with 304 from a single query"""
+        with self.assertNumQueries(1):
+            resource = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resource.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assertModified(self, url, etag):
+        """Asserts url is answered with a new representation"""
+        resource = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resource['ETag'], etag)
+
+    def test_list_not_modified(self):
+        """Test an unchanged recipe list is answered with 304"""
+        resource = self.client.get(RECIPE_URL)
+
+        self.assertNotModified(RECIPE_URL, resource['ETag'])
+
+    def test_list_modified_after_create_and_delete(self):
+        """Test creating or deleting a recipe changes the list ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        recipe = sample_recipe(user=self.user, title='New')
+        self.assertModified(RECIPE_URL, etag)
+
+        etag = self.client.get(RECIPE_URL)['ETag']
+        recipe.delete()
+        self.assertModified(RECIPE_URL, etag)
+
+    def test_list_if_modified_since_after_delete(self):
+        """Test a list isn't answered with 304 after a recipe is deleted"""
+        sample_recipe(user=self.user, title='New')
+        resource = self.client.get(RECIPE_URL)
+        self.assertNotIn('Last-Modified', resource)
+
+        self.recipe.delete()
+        resource = self.client.get(
+            RECIPE_URL,
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resource.data['results']), 1)
+
+    def test_list_etag_depends_on_query(self):
+        """Test filtered lists get their own ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        resource = self.client.get(
+            RECIPE_URL,
+            {'max_time': 100},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+
+    def test_detail_modified_after_relation_changes(self):
+        """Test linking or renaming a tag changes the detail ETag"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        self.assertModified(url, etag)
+
+        etag = self.client.get(url)['ETag']
+        tag.name = 'Renamed'
+        tag.save()
+        self.assertModified(url, etag)
+
+    def test_detail_if_modified_since(self):
+        """Test Last-Modified is honoured with If-Modified-Since"""
+        url = detail_url(self.recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        resource = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(resource.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tag_list_not_modified(self):
+        """Test an unchanged tag list is answered with 304"""
+        tag_url = reverse('recipe:tag-list')
+        sample_tag(user=self.user)
+        etag = self.client.get(tag_url)['ETag']
+
+        self.assertNotModified(tag_url, etag)
+
+
+class RecipeResponseCacheTests(TestCase):
+    """Tests serving recipe lists from the response cache"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_repeated_list_is_cached(self):
+        """Test a repeated list only runs the version query"""
+        first = self.client.get(RECIPE_URL, {'max_time': 100})
+        stats = response_cache.stats()
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPE_URL, {'max_time': 100})
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats()['hits'], stats['hits'] + 1)
+
+    def test_query_params_are_part_of_the_key(self):
+        """Test different filters are cached separately"""
+        self.client.get(RECIPE_URL, {'max_time': 100})
+
+        resource = self.client.get(RECIPE_URL, {'max_time': 5})
+
+        self.assertEqual(resource['X-Cache'], 'MISS')
+        self.assertEqual(resource.data['results'], [])
+
+    def test_cache_is_per_user(self):
+        """Test users never see each other's cached lists"""
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            'other@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(other)
+
+        resource = self.client.get(RECIPE_URL)
+
+        self.assertEqual(resource['X-Cache'], 'MISS')
+        self.assertEqual(resource.data['results'], [])
+
+    def test_write_invalidates_list(self):
+        """Test creating and deleting recipes drops the cached list"""
+        self.client.get(RECIPE_URL)
+        self.client.post(RECIPE_URL, {
+            'title': 'New recipe',
+            'time_minutes': 5,
+            'price': 1.00,
+            'tags': [sample_tag(user=self.user).id],
+            'ingredients': [],
+        })
+
+        resource = self.client.get(RECIPE_URL)
+        self.assertEqual(resource['X-Cache'], 'MISS')
+        self.assertEqual(len(resource.data['results']), 2)
+
+        self.client.delete(detail_url(self.recipe.id))
+        resource = self.client.get(RECIPE_URL)
+        self.assertEqual(len(resource.data['results']), 1)
+
+    def test_m2m_change_invalidates_lists(self):
+        """Test linking a tag drops the recipe and tag lists"""
+        tag = sample_tag(user=self.user)
+        tag_url = reverse('recipe:tag-list')
+        self.client.get(RECIPE_URL)
+        self.client.get(tag_url, {'assigned_only': 1})
+
+        tag.recipe_set.add(self.recipe)
+
+        recipes = self.client.get(RECIPE_URL)
+        tags = self.client.get(tag_url, {'assigned_only': 1})
+        self.assertEqual(recipes['X-Cache'], 'MISS')
+        self.assertEqual(recipes.data['results'][0]['tags'], [tag.id])
+        self.assertEqual(tags['X-Cache'], 'MISS')
+        self.assertEqual(len(tags.data['results']), 1)
+
+    def test_renaming_tag_invalidates_searches(self):
+        """Test renamed tags and ingredients drop the recipe lists"""
+        tag = sample_tag(user=self.user, name='Vegan')
+        ingredient = sample_ingredient(user=self.user, name='Tofu')
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+        self.client.get(RECIPE_URL, {'search': 'vegan'})
+        self.client.get(RECIPE_URL, {'search': 'tofu'})
+
+        tag.name = 'Meat'
+        tag.save()
+        self.client.patch(
+            reverse('recipe:ingredient-bulk'),
+            [{'id': ingredient.id, 'name': 'Beef'}],
+            format='json'
+        )
+
+        for search in ('vegan', 'tofu'):
+            resource = self.client.get(RECIPE_URL, {'search': search})
+            self.assertEqual(resource['X-Cache'], 'MISS')
+            self.assertEqual(resource.data['results'], [])
+
+    def test_replica_reads_not_cached(self):
+        """Test lists read from a replica are not cached"""
+        with patch('recipe.mixins.current_replica', return_value='replica0'):
+            self.client.get(RECIPE_URL)
+            resource = self.client.get(RECIPE_URL)
+
+        self.assertEqual(resource['X-Cache'], 'MISS')
+
+    def test_other_resources_stay_cached(self):
+        """Test creating a tag keeps the recipe list cached"""
+        self.client.get(RECIPE_URL)
+        sample_tag(user=self.user)
+
+        resource = self.client.get(RECIPE_URL)
+
+        self.assertEqual(resource['X-Cache'], 'HIT')
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    })
+    def test_shared_backend_generations(self):
+        """Test invalidation through a shared cache reaches every worker"""
+        workers = [ResponseCache(shared_alias='default') for _ in range(2)]
+        request = Request(APIRequestFactory().get(RECIPE_URL))
+        request.user = self.user
+        key = workers[0].key(request, 'recipe')
+        workers[0].set(key, {'results': []})
+
+        self.assertEqual(workers[1].get(key), {'results': []})
+
+        workers[1].invalidate(self.user.pk, 'recipe')
+
+        self.assertNotEqual(workers[0].key(request, 'recipe'), key)
+
+    def test_local_generations_bounded(self):
+        """Test local generations are evicted with the entries"""
+        cache = ResponseCache(maxsize=2)
+        for user_id in range(10):
+            cache.invalidate(user_id, 'recipe', 'tag')
+
+        self.assertEqual(len(cache.entries.local), 2)
+
+    @override_settings(WEB_WORKERS=2, RESPONSE_CACHE={'TTL': 300})
+    def test_several_workers_need_shared_cache(self):
+        """Test a cache local to each of several workers is refused"""
+        with self.assertRaises(ImproperlyConfigured):
+            _build_response_cache()
+
+
+@override_settings(ROOT_URLCONF='app.asgi_urls')
+class RecipeAsyncViewTests(TransactionTestCase):
+    """Tests the async recipe views served under ASGI"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        token = Token.objects.create(user=self.user)
+        self.headers = {'authorization': f'Token {token.key}'}
+        self.client = AsyncClient()
+        self.recipe = sample_recipe(user=self.user)
+        self.recipe.tags.add(sample_tag(user=self.user))
+
+    async def test_async_list_and_retrieve(self):
+        """Test the read endpoints answer like the sync views"""
+        recipes = await self.client.get(RECIPE_URL, **self.headers)
+        detail = await self.client.get(
+            detail_url(self.recipe.id),
+            **self.headers
+        )
+        tags = await self.client.get(
+            reverse('recipe:tag-list'),
+            **self.headers
+        )
+
+        self.assertEqual(recipes.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipes.json()['results'][0]['id'], self.recipe.id)
+        self.assertEqual(detail.json()['tags'][0]['name'], 'Dope')
+        self.assertEqual(len(tags.json()['results']), 1)
+
+    async def test_async_export(self):
+        """Test exports are spooled and sent whole under ASGI"""
+        response = await self.client.get(
+            reverse('recipe:recipe-export'),
+            **self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(json.loads(lines[0])['tags'], ['Dope'])
+
+    async def test_async_views_require_authentication(self):
+        """Test the async views keep the token authentication"""
+        res = await self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_views_not_modified(self):
+        """Test conditional requests still get 304 responses"""
+        res = await self.client.get(RECIPE_URL, **self.headers)
+
+        res = await self.client.get(
+            RECIPE_URL,
+            **{'if-none-match': res['ETag']},
+            **self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class RecipeCompiledSerializerTests(TestCase):
+    """Tests rendering lists from .values() rows"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.request = Request(APIRequestFactory().get(RECIPE_URL))
+        self.request.user = self.user
+
+        tags = [sample_tag(user=self.user, name=name)
+                for name in ('Vegan', 'Caf\u00e9 \u2028')]
+        ingredient = sample_ingredient(user=self.user)
+        recipe = sample_recipe(
+            user=self.user,
+            price=12.5,
+            link='https://example.com/recipe',
+            image='uploads/recipe/sample.jpg',
+            image_variants={
+                'thumbnail': {'name': 'uploads/recipe/sample_thumbnail.jpeg'}
+            }
+        )
+        recipe.tags.add(*reversed(tags))
+        recipe.ingredients.add(ingredient)
+        sample_recipe(user=self.user, title='No relations')
+
+    def assertIdentical(self, serializer_class, queryset):
+        """Asserts both paths render the same bytes"""
+        context = {'request': self.request}
+        expected = serializer_class(
+            queryset.order_by('id'),
+            many=True,
+            context=context
+        ).data
+        compiled = compile_serializer(serializer_class)
+        data = compiled.serialize(
+            queryset.order_by('id').values(*compiled.columns),
+            context
+        )
+
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            self.assertEqual(renderer.render(data), renderer.render(expected))
+
+    def test_recipes_identical(self):
+        """Test compiled recipes match the serializer output"""
+        queryset = Recipe.objects.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.order_by('id'))
+        )
+        self.assertIdentical(RecipeSerializer, queryset)
+
+    def test_tags_and_ingredients_identical(self):
+        """Test compiled tags and ingredients match the serializer output"""
+        self.assertIdentical(TagSerializer, Tag.objects.all())
+        self.assertIdentical(IngredientSerializer, Ingredient.objects.all())
+
+    def test_nested_serializer_not_compiled(self):
+        """Test serializers with nested objects keep the regular path"""
+        self.assertIsNone(compile_serializer(RecipeDetailSerializer))
+
+    def test_list_endpoint_uses_compiled_rows(self):
+        """Test the list endpoint renders the same as the serializer"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPE_URL)
+
+        recipes = Recipe.objects.order_by('id')
+        expected = RecipeSerializer(
+            recipes,
+            many=True,
+            context={'request': res.wsgi_request}
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(res.data['results']),
+            JSONRenderer().render(expected)
+        )
+
+
+class RecipeExportTests(TestCase):
+    """Tests streaming the recipe library"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Curry', price=7.5)
+        self.recipe.tags.add(
+            sample_tag(user=self.user, name='Spicy'),
+            sample_tag(user=self.user, name='Dinner')
+        )
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+
+    def export(self, **params):
+        res = self.client.get(reverse('recipe:recipe-export'), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test recipes are streamed as one JSON object per line"""
+        other = get_user_model().objects.create_user('o@server.com', 'pass')
+        sample_recipe(user=other)
+
+        res, content = self.export()
+
+        self.assertEqual(
+            res['Content-Type'],
+            'application/x-ndjson; charset=utf-8'
+        )
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), {
+            'id': self.recipe.id,
+            'title': 'Curry',
+            'time_minutes': 10,
+            'price': '7.50',
+            'link': '',
+            'image': None,
+            'tags': ['Dinner', 'Spicy'],
+            'ingredients': ['Paperika'],
+        })
+
+    def test_export_csv(self):
+        """Test recipes are streamed as CSV with joined related names"""
+        res, content = self.export(format='csv')
+
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(rows[0][-2:], ['tags', 'ingredients'])
+        self.assertEqual(rows[1][1], 'Curry')
+        self.assertEqual(rows[1][-2:], ['Dinner;Spicy', 'Paperika'])
+
+    def test_export_empty_csv_has_header(self):
+        """Test an empty export still writes the CSV header"""
+        _, content = self.export(format='csv', min_time=100)
+
+        self.assertEqual(content.splitlines(), [
+            'id,title,time_minutes,price,link,image,tags,ingredients'
+        ])
+
+    def test_export_queries_per_chunk(self):
+        """Test related names are fetched once per chunk of recipes"""
+        for i in range(4):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            with self.assertNumQueries(1 + 3 * 2):
+                _, content = self.export()
+
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_spool(self):
+        """Test spooled content is read back whole, past the memory limit"""
+        content = spool((b'a' * 10 for _ in range(5)), max_memory=20)
+
+        with content:
+            self.assertEqual(content.read(), b'a' * 50)
+
+
+class RecipeImportApiTests(TestCase):
+    """Tests importing recipes from uploaded files"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@server.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        if isinstance(content, str):
+            content = content.encode()
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post(
+            reverse('recipe:recipe-import-recipes'),
+            {'file': upload, **data},
+            format='multipart'
+        )
+
+    def test_import_exported_csv(self):
+        """Test an exported CSV library imports back"""
+        recipe = sample_recipe(user=self.user, title='Curry')
+        recipe.tags.add(sample_tag(user=self.user, name='Spicy'))
+        export = self.client.get(
+            reverse('recipe:recipe-export'),
+            {'format': 'csv'}
+        )
+        content = b''.join(export.streaming_content).decode()
+
+        res = self.upload('recipes.csv', content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['errors'], [])
+        imported = Recipe.objects.exclude(id=recipe.id).get()
+        self.assertEqual(imported.title, 'Curry')
+        self.assertEqual(list(imported.tags.all()), list(recipe.tags.all()))
+
+    def test_import_reports_row_errors(self):
+        """Test invalid rows are reported while valid ones are imported"""
+        res = self.upload('recipes.txt', '\n'.join([
+            json.dumps({'title': 'Soup', 'time_minutes': 5, 'price': 1}),
+            json.dumps({'title': 'Soup', 'price': 1}),
+        ]), format='ndjson')
+
+        self.assertEqual(res.data['processed'], 2)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['errors'][0]['line'], 2)
+        self.assertIn('time_minutes', res.data['errors'][0]['errors'])
+
+    def test_import_unknown_format(self):
+        """Test files of unknown formats are rejected"""
+        res = self.upload('recipes.xml', '<recipes/>')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_undecodable_file(self):
+        """Test a file that isn't UTF-8 is reported as a row error"""
+        for name in ('recipes.ndjson', 'recipes.csv'):
+            res = self.upload(name, 'title\nCr\xe8me br\xfbl\xe9e\n'.encode(
+                'latin-1'
+            ))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['created'], 0)
+            self.assertIn(
+                'Unreadable file',
+                res.data['errors'][-1]['errors']['non_field_errors'][0]
+            )
@@ -58,7 +58,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
-        self.assertEqual(resource.data, serializer.data)
+        self.assertEqual(resource.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags are limited to the user"""
@@ -72,8 +72,8 @@ class PrivateTagsApiTests(TestCase):
         resource = self.client.get(TAGS_URL)
         serializer = TagSerializer(tag)
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resource.data), 1)
-        self.assertEqual(resource.data[0], serializer.data)
+        self.assertEqual(len(resource.data['results']), 1)
+        self.assertEqual(resource.data['results'][0], serializer.data)
 
     def test_create_tag_successfully(self):
         """Test creates new tag successfully"""
@@ -104,8 +104,8 @@ class PrivateTagsApiTests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, resource.data)
-        self.assertNotIn(serializer2.data, resource.data)
+        self.assertIn(serializer1.data, resource.data['results'])
+        self.assertNotIn(serializer2.data, resource.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -118,4 +118,155 @@ class PrivateTagsApiTests(TestCase):
 
         resource = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(resource.data), 1)
+        self.assertEqual(len(resource.data['results']), 1)
+
+    def test_retrieve_assigned_tags_follows_links(self):
+        """Test assigned tags aren't answered from a stale ETag"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag1)
+        resource = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertNotIn('ETag', resource)
+
+        recipe.tags.set([tag2])
+        resource = self.client.get(
+            TAGS_URL,
+            {'assigned_only': 1},
+            HTTP_IF_NONE_MATCH='*'
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['id'] for tag in resource.data['results']],
+            [tag2.id]
+        )
+
+    def test_paginate_tags_by_name(self):
+        """Test tags are paginated in descending name order"""
+        for name in ('Breakfast', 'Dinner', 'Lunch', 'Brunch'):
+            Tag.objects.create(user=self.user, name=name)
+
+        resource = self.client.get(TAGS_URL, {'page_size': 3})
+        names = [tag['name'] for tag in resource.data['results']]
+        resource = self.client.get(resource.data['next'])
+        names += [tag['name'] for tag in resource.data['results']]
+
+        self.assertEqual(names, ['Lunch', 'Dinner', 'Brunch', 'Breakfast'])
+        self.assertIsNone(resource.data['next'])
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        resource = self.client.post(
+            reverse('recipe:tag-bulk'),
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True
+            )),
+            ['Dessert', 'Vegan']
+        )
+
+    def test_create_existing_tag_returns_it(self):
+        """Test creating a tag twice returns the existing tag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        resource = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(resource.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_same_tag_name_for_other_user(self):
+        """Test that tag names are only unique for a user"""
+        user2 = get_user_model().objects.create_user(
+            'other@server.com',
+            'pass123'
+        )
+        Tag.objects.create(user=user2, name='Vegan')
+
+        resource = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(resource.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 2)
+
+    def test_bulk_create_existing_tags(self):
+        """Test bulk creating reuses existing and repeated names"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Dessert'}]
+
+        resource = self.client.post(
+            reverse('recipe:tag-bulk'),
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_201_CREATED)
+        ids = [item['id'] for item in resource.data]
+        self.assertEqual(ids[0], tag.id)
+        self.assertEqual(ids[1], ids[2])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_rename_to_existing_tag(self):
+        """Test renaming a tag onto an existing name is rejected"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        resource = self.client.patch(
+            reverse('recipe:tag-bulk'),
+            [{'id': tag.id, 'name': 'Vegan'}],
+            format='json'
+        )
+
+        self.assertEqual(resource.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
+
+    def test_retrieve_tags_with_counts(self):
+        """Test listing tags with the number of recipes using them"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            sample_recipe(user=self.user, title=title).tags.add(tag1)
+
+        resource = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(resource.status_code, status.HTTP_200_OK)
+        self.assertEqual(resource.data['results'], [
+            {'id': tag2.id, 'name': 'Lunch', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_retrieve_assigned_tags_with_counts(self):
+        """Test counts combine with filtering assigned tags in one query"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        with self.assertNumQueries(1):
+            resource = self.client.get(
+                TAGS_URL,
+                {'assigned_only': 1, 'with_counts': 1}
+            )
+
+        self.assertEqual(resource.data['results'], [
+            {'id': tag.id, 'name': 'Breakfast', 'recipe_count': 1},
+        ])
+
+    def test_invalid_flags_rejected(self):
+        """Test flags other than 0 or 1 are a bad request"""
+        for params in ({'with_counts': 'yes'}, {'assigned_only': 'abc'}):
+            resource = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(
+                resource.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+            self.assertIn(list(params)[0], resource.data)
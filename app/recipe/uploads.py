@@ -0,0 +1,259 @@
+import fcntl
+import io
+import os
+import re
+import warnings
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http import multipartparser
+from django.http.multipartparser import MultiPartParserError
+from django.utils.translation import gettext as _
+
+from PIL import Image
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+# Leading bytes of the accepted image formats, WebP files start with
+# RIFF????WEBP
+SIGNATURES = {
+    'JPEG': (b'\xff\xd8\xff',),
+    'PNG': (b'\x89PNG\r\n\x1a\n',),
+    'GIF': (b'GIF87a', b'GIF89a'),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+SIGNATURE_LENGTH = 12
+# Room for the other fields and boundaries of a multipart upload
+MULTIPART_OVERHEAD = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class ImageUploadError(MultiPartParserError):
+    """The uploaded image was rejected"""
+
+
+class OffsetConflict(Exception):
+    """A chunk doesn't start where the partial upload ends"""
+
+
+def detect_format(data):
+    """Return the image format from the leading bytes of a file"""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'WEBP'
+    for file_format, signatures in SIGNATURES.items():
+        if data.startswith(signatures):
+            return file_format
+
+    raise ImageUploadError(_('Upload a JPEG, PNG, GIF or WebP image.'))
+
+
+def check_image_header(data, complete=False):
+    """Validate the start of an image without decoding its pixels
+
+    Returns False while more data is needed to read the header, True once
+    the format and dimensions are acceptable and raises ImageUploadError
+    otherwise. complete tells data holds the whole file.
+    """
+    if len(data) < SIGNATURE_LENGTH and not complete:
+        return False
+    file_format = detect_format(data)
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+                opened_format = image.format
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ImageUploadError(_('The image has too many pixels.'))
+    except Exception:
+        # Pillow raises a variety of errors on truncated headers, wait for
+        # more data unless there isn't any.
+        if complete or len(data) >= settings.RECIPE_IMAGE_HEADER_SIZE:
+            raise ImageUploadError(_('The image header is invalid.'))
+        return False
+
+    max_width, max_height = settings.RECIPE_IMAGE_MAX_DIMENSIONS
+    if opened_format != file_format:
+        raise ImageUploadError(_('The image header is invalid.'))
+    if width > max_width or height > max_height:
+        raise ImageUploadError(
+            _('Ensure the image is at most {width}x{height} pixels.').format(
+                width=max_width,
+                height=max_height
+            )
+        )
+
+    return True
+
+
+def check_image_size(size):
+    """Reject images larger than the upload limit"""
+    if size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+        raise ImageUploadError(
+            _('Ensure the image is at most {size} bytes.').format(
+                size=settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+            )
+        )
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploaded images to disk, validating them as they arrive
+
+    The request size is checked before anything is read and each file is
+    rejected as soon as its header or its size turn out to be invalid.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        check_image_size(content_length - MULTIPART_OVERHEAD)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.header_valid = False
+
+    def receive_data_chunk(self, raw_data, start):
+        check_image_size(start + len(raw_data))
+        if not self.header_valid:
+            self.header += raw_data
+            self.header_valid = check_image_header(self.header)
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.header_valid:
+            check_image_header(self.header, complete=True)
+
+        return super().file_complete(file_size)
+
+
+class RecipeImageMultiPartParser(MultiPartParser):
+    """Multipart parser streaming image uploads to temporary files"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+
+        try:
+            parser = multipartparser.MultiPartParser(
+                meta,
+                stream,
+                [RecipeImageUploadHandler(request)],
+                encoding
+            )
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except ImageUploadError as exc:
+            raise ParseError(str(exc))
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
+
+
+def parse_content_range(value):
+    """Return start, end and total of a Content-Range header"""
+    match = CONTENT_RANGE.match(value or '')
+    if match is None:
+        raise ValueError(value)
+
+    start, end, total = (int(group) for group in match.groups())
+    if start > end or end >= total:
+        raise ValueError(value)
+
+    return start, end, total
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """A completed chunked upload, moved into storage when saved"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ChunkedImageUpload:
+    """Resumable upload of a recipe image sent as ranges of bytes
+
+    The received bytes are appended to a partial file, so an interrupted
+    upload resumes from offset. Writes hold an exclusive lock on the file,
+    concurrent chunks for the same upload are refused rather than both
+    appended.
+    """
+    read_size = 64 * 1024
+
+    def __init__(self, recipe):
+        self.path = os.path.join(
+            settings.RECIPE_IMAGE_CHUNK_DIR,
+            f'recipe-{recipe.pk}.part'
+        )
+
+    @property
+    def offset(self):
+        """Return the number of bytes received so far"""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _head(self):
+        with open(self.path, 'rb') as partial:
+            return partial.read(settings.RECIPE_IMAGE_HEADER_SIZE)
+
+    def write(self, stream, start, end, total):
+        """Append the bytes start to end of the image read from stream
+
+        Raises OffsetConflict when another chunk is being written or start
+        isn't the offset anymore.
+        """
+        check_image_size(total)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        length = end - start + 1
+        with open(self.path, 'ab') as partial:
+            try:
+                fcntl.flock(partial, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise OffsetConflict()
+            # Checked again under the lock, the view's check may be stale
+            if os.fstat(partial.fileno()).st_size != start:
+                raise OffsetConflict()
+
+            # DRF gives no stream for an empty body
+            while stream is not None and length > 0:
+                data = stream.read(min(self.read_size, length))
+                if not data:
+                    break
+                partial.write(data)
+                length -= len(data)
+
+            if length > 0:
+                partial.truncate(start)
+                raise ImageUploadError(_('The request body is shorter than '
+                                         'its Content-Range.'))
+
+        if start < settings.RECIPE_IMAGE_HEADER_SIZE:
+            check_image_header(self._head(), complete=end + 1 == total)
+
+        return end + 1
+
+    def as_file(self):
+        """Return the completed upload as an uploaded file"""
+        file_format = detect_format(self._head())
+        return ChunkedUploadedFile(
+            file=open(self.path, 'rb'),
+            name=f'upload.{EXTENSIONS[file_format]}',
+            content_type=f'image/{file_format.lower()}',
+            size=self.offset
+        )
+
+    def discard(self):
+        """Remove the received bytes"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,35 +1,123 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication
+)
+from core.renderers import CSVRenderer, NDJSONRenderer
 from core.models import Tag
 from core.models import Ingredient
 from core.models import Recipe
 
 from recipe import serializers
+from recipe import pagination
+from recipe.conditional import ConditionalGetMixin
+from recipe.export import EXPORT_FIELDS, export_recipes, spool
+from recipe.filters import RecipeFilter
+from recipe.images import delete_variants, enqueue_variants
+from recipe.importer import (
+    FORMATS, RecipeImporter, format_from_name, read_records
+)
+from recipe.search import search_recipes
+from recipe.uploads import (
+    ChunkedImageUpload, ImageUploadError, OffsetConflict,
+    RecipeImageMultiPartParser, parse_content_range
+)
+from recipe.mixins import (
+    BulkModelMixin, CachedListMixin, CompiledListMixin
+)
 
 
-class BaseRecipeAttributesViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttributesViewSet(ConditionalGetMixin,
+                                  CachedListMixin,
+                                  CompiledListMixin,
+                                  BulkModelMixin,
+                                  viewsets.GenericViewSet,
                                   mixins.ListModelMixin,
                                   mixins.CreateModelMixin):
     """Base viewsets for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.RecipeAttributeCursorPagination
+
+    def _flag(self, name):
+        """Return whether a 0 or 1 query param is set"""
+        value = self.request.query_params.get(name, '0')
+        if value not in ('0', '1'):
+            raise ValidationError({name: ['Expected 0 or 1.']})
+
+        return value == '1'
+
+    def _recipe_links(self):
+        """Return the recipe links of the object of the outer query"""
+        field = self.queryset.model._meta.get_field('recipe').remote_field
+        column = field.m2m_reverse_field_name()
+        return field.remote_field.through.objects.filter(**{
+            column: OuterRef('pk')
+        }).order_by().values(column)
 
     def get_queryset(self):
-        """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        """Return objects for the current authenticated user only
 
-        return queryset.filter(
-            user=self.request.user
-        ).distinct().order_by('-name')
+        assigned_only keeps the objects used by a recipe with an EXISTS
+        subquery, which neither multiplies nor has to de-duplicate rows.
+        with_counts annotates the number of recipes using each object.
+        """
+        queryset = self.queryset.filter(user=self.request.user)
+        if self._flag('assigned_only'):
+            queryset = queryset.filter(Exists(self._recipe_links()))
+        if self._flag('with_counts'):
+            counts = self._recipe_links().annotate(count=Count('pk'))
+            queryset = queryset.annotate(recipe_count=Coalesce(
+                Subquery(counts.values('count')),
+                0
+            ))
+
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self._flag('with_counts'):
+            return self.count_serializer_class
+
+        return self.serializer_class
+
+    def list(self, request, *args, **kwargs):
+        if self._flag('with_counts') or self._flag('assigned_only'):
+            # Counts and the assigned objects change with the recipe links,
+            # which the ETag doesn't cover
+            return super(ConditionalGetMixin, self).list(
+                request,
+                *args,
+                **kwargs
+            )
+
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        """Get or create the named object, 200 when it already existed"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(
+            serializer.data,
+            status=(
+                status.HTTP_201_CREATED if serializer.created
+                else status.HTTP_200_OK
+            ),
+            headers=self.get_success_headers(serializer.data)
+        )
 
     def perform_create(self, serializer):
         """Creating new object"""
@@ -40,45 +128,80 @@ class TagViewSet(BaseRecipeAttributesViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
 
 
 class IngredientViewSet(BaseRecipeAttributesViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    CachedListMixin,
+                    CompiledListMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.defer('search_vector')
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.RecipeCursorPagination
+    export_chunk_size = 1000
+    throttle_scopes = {
+        'upload_image': 'upload',
+        'upload_image_chunk': 'upload_chunk',
+        'import_recipes': 'upload',
+    }
+
+    # Columns of the related objects each action's serializer renders, the
+    # list only needs primary keys while the detail nests the names too.
+    related_fields = {
+        'list': ('id',),
+        'retrieve': ('id', 'name'),
+    }
 
-    def _params_to_ints(self, qs):
-        """Converts a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def _get_prefetches(self):
+        """Return the related lookups to prefetch for the current action"""
+        fields = self.related_fields.get(self.action)
+        if fields is None:
+            return []
+
+        # Ordered like the related ids of the compiled list serializer
+        return [
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only(*fields).order_by('id')
+            ),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(*fields).order_by('id')
+            ),
+        ]
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = RecipeFilter(
+            self.request.query_params
+        ).filter_queryset(self.queryset)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
 
-        return queryset.filter(user=self.request.user).order_by('id')
+        return queryset.filter(
+            user=self.request.user
+        ).prefetch_related(*self._get_prefetches()).order_by('id')
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'upload_image_chunk'):
             return serializers.RecipeImageSerializer
 
         return self.serializer_class
@@ -87,17 +210,72 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Creating new object"""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
-    def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
-        recipe = self.get_object()
-        serializer = self.get_serializer(
-            recipe,
-            data=request.data
+    @action(methods=['GET'], detail=False,
+            renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        """Stream every recipe matching the filters as NDJSON or CSV
+
+        Under ASGI the export is written to a temporary file first and sent
+        once complete.
+        """
+        renderer = request.accepted_renderer
+        chunks = export_recipes(
+            self.filter_queryset(self.get_queryset()),
+            request,
+            chunk_size=self.export_chunk_size,
+            flat=isinstance(renderer, CSVRenderer)
+        )
+        if isinstance(renderer, CSVRenderer):
+            content = renderer.stream(chunks, header=EXPORT_FIELDS)
+        else:
+            content = renderer.stream(chunks)
+        if isinstance(request._request, ASGIRequest):
+            # Only streamed under WSGI, ASGI iterates on the event loop
+            content = spool(content)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
         )
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='import',
+            parser_classes=(MultiPartParser,))
+    def import_recipes(self, request):
+        """Import the recipes of an uploaded NDJSON or CSV file"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'file': ['No file was submitted.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = request.data.get('format') or format_from_name(
+            upload.name
+        )
+        if file_format not in FORMATS:
+            return Response(
+                {'format': ['Expected ndjson or csv.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = RecipeImporter(request.user).run(
+            read_records(upload.file, file_format)
+        )
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+    def _save_image(self, recipe, data):
+        """Validate and save a new image, then build its variants"""
+        old_variants = recipe.image_variants
+        serializer = self.get_serializer(recipe, data=data)
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_variants={})
+            delete_variants(old_variants)
+            enqueue_variants(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -107,3 +285,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=True, url_path='upload-image',
+            parser_classes=(RecipeImageMultiPartParser,))
+    def upload_image(self, request, pk=None):
+        """Upload an image to a recipe"""
+        recipe = self.get_object()
+        return self._save_image(recipe, request.data)
+
+    @action(methods=['GET', 'PUT', 'DELETE'], detail=True,
+            url_path='upload-image/chunks')
+    def upload_image_chunk(self, request, pk=None):
+        """Upload an image to a recipe in resumable chunks
+
+        PUT sends the bytes described by the Content-Range header, GET
+        returns the offset to resume from and DELETE drops the upload.
+        """
+        recipe = self.get_object()
+        upload = ChunkedImageUpload(recipe)
+
+        if request.method == 'GET':
+            return Response({'offset': upload.offset})
+        if request.method == 'DELETE':
+            upload.discard()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            start, end, total = parse_content_range(
+                request.META.get('HTTP_CONTENT_RANGE')
+            )
+        except ValueError:
+            return Response(
+                {'image': ['Invalid Content-Range header.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            offset = upload.write(request.stream, start, end, total)
+        except OffsetConflict:
+            return Response(
+                {'offset': upload.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ImageUploadError as exc:
+            upload.discard()
+            return Response(
+                {'image': [str(exc)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if offset < total:
+            return Response(
+                {'offset': offset},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        image = upload.as_file()
+        try:
+            return self._save_image(recipe, {'image': image})
+        finally:
+            image.close()
+            upload.discard()
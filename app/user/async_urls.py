@@ -0,0 +1,22 @@
+from django.urls import URLPattern
+
+from recipe.async_views import async_view
+from user import urls
+
+app_name = 'user'
+
+
+def _async_pattern(pattern):
+    if pattern.name != 'token':
+        return pattern
+
+    # Logins mostly wait on the hashing pool, serve them concurrently
+    return URLPattern(
+        pattern.pattern,
+        async_view(pattern.callback, concurrent_methods=('POST',)),
+        pattern.default_args,
+        pattern.name
+    )
+
+
+urlpatterns = [_async_pattern(pattern) for pattern in urls.urlpatterns]
@@ -1,13 +1,19 @@
-from django.test import TestCase
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings
+)
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from asgiref.sync import sync_to_async
+
 from rest_framework.test import APIClient
 from rest_framework import status
 
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+TOKEN_REFRESH_URL = reverse('user:token-refresh')
+TOKEN_REVOKE_URL = reverse('user:token-revoke')
 ME_URL = reverse('user:me')
 
 
@@ -98,6 +104,36 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', resource.data)
         self.assertEquals(resource.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_token_authenticates_until_revoked(self):
+        """Test a login token can be refreshed and revoked"""
+        payload = {'email': 'email@server.com', 'password': 'pass123'}
+        create_user(**payload)
+        token = self.client.post(TOKEN_URL, payload).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        resource = self.client.post(TOKEN_REFRESH_URL)
+        self.assertEquals(resource.status_code, status.HTTP_200_OK)
+        self.assertIn('expires', resource.data)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {resource.data['token']}"
+        )
+        self.assertEquals(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_200_OK
+        )
+
+        resource = self.client.post(TOKEN_REVOKE_URL)
+        self.assertEquals(resource.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEquals(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEquals(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
     def test_retrieve_user_unauthorized(self):
         """Test that authentication is required for users"""
         resource = self.client.post(ME_URL)
@@ -143,3 +179,22 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(resource.status_code, status.HTTP_200_OK)
+
+
+@override_settings(ROOT_URLCONF='app.asgi_urls')
+class AsyncTokenApiTests(TransactionTestCase):
+    """Tests the token endpoint served under ASGI"""
+
+    async def test_create_token_concurrently(self):
+        """Test logins are answered by the async token view"""
+        payload = {'email': 'email@server.com', 'password': 'pass123'}
+        await sync_to_async(create_user)(**payload)
+
+        resource = await AsyncClient().post(
+            TOKEN_URL,
+            payload,
+            content_type='application/json'
+        )
+
+        self.assertEquals(resource.status_code, status.HTTP_200_OK)
+        self.assertIn('token', resource.json())